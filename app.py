@@ -1,8 +1,18 @@
 import streamlit as st
-import pandas as pd
-import google.generativeai as genai
 import time
-import io
+import uuid
+from engine import GenerationCancelled, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+from jobs import JobManager, FairScheduler, RUNNING, QUEUED, DONE, FAILED, CANCELLED
+from batching import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE
+from prompt_compiler import classify_profiles, variant_report
+from summary_cache import SummaryCache, DEFAULT_CACHE_PATH
+from backends import GeminiBackend
+from ingest import content_hash, read_columns, load_table, UPLOAD_TYPES
+from export import ResultExporter, MIME_TYPES, XLSX, PARQUET, CSV
+from pipeline import SUMMARY_COLUMN
+from metrics import RunMetrics
+from validator import regenerate_invalid, validate_summary, format_issues, DEFAULT_MAX_ATTEMPTS, VALIDATION_COLUMN
+from summarizer import MASTER_PROMPT, EXPECTED_COMPETENCIES, generate_summaries
 
 # --- Configuration ---
 # Set page configuration. This must be the first Streamlit command.
@@ -11,261 +21,260 @@ st.set_page_config(
     page_icon="✍️",
     layout="wide"
 )
-
-# --- The Master Prompt ---
-# This is the full, untrimmed prompt, incorporating all rules and examples.
-MASTER_PROMPT = """
-ROLE
-You are an expert Talent Assessment Analyst at "Your Assessment Company". Your name is "Aura," and your purpose is to synthesize competency score data into insightful, objective, and developmental executive summaries. You write in American English, and you are a master of the assessment framework, adhering strictly to the interpretation guidelines provided below.
-
-CONTEXT
-We are an assessment platform that evaluates candidates on a set of core competencies using a 1-5 scoring scale. Your task is to automate the creation of the executive summary that is shared with the candidate. The summary must be objective, constructive, evidence-based (tied directly to the scores), and written in a formal, professional tone consistent with our brand. The goal is to provide clear feedback on strengths and developmental areas.
-
-TASK
-For a given candidate, you will receive their name and a list of competencies with their corresponding scores (from 1 to 5). Your sole task is to generate a two-paragraph Executive Summary based on these scores. You must follow all rules of interpretation, tone, structure, and formatting provided below without exception.
-
-CORE COMPETENCIES
-Leads Inspirationally
-
-Manages and Solves Problems
-
-Plans and Thinks Strategically
-
-Manages Change
-
-RULES OF INTERPRETATION & CONTENT
-Scoring Guide:
-
-Scores 4 & 5: These are considered Strengths.
-
-Score 3: This is considered a Potential Strength that can be further leveraged.
-
-Scores 1 & 2: These are considered Development Areas.
-
-Executive Summary Structure:
-The summary MUST be exactly two paragraphs and not exceed 400 words in total.
-
-Paragraph 1: Strengths & Potential Strengths (150-200 words)
-
-This paragraph MUST begin with the exact sentence: "As part of the assessment center, you displayed strengths in.." followed by the names of the competencies scored 4 or 5.
-
-First, elaborate on the strengths (scores 4-5).
-
-After discussing the clear strengths, address any potential strengths (score 3). Frame these as solid skills that can be leveraged even further. Substantiate the potential by briefly mentioning the specific behaviors that were observed (e.g., "demonstrating an understanding of their individual needs," "breaking down objectives into actionable steps").
-
-All competency names MUST be capitalized (e.g., Plans and Thinks Strategically).
-
-Paragraph 2: Development Areas (150-200 words)
-
-This paragraph MUST begin with the exact sentence: "Developmentally, scope exists for you to further develop in…" followed by the names of the competencies scored 1 or 2.
-
-Elaborate on the development areas. The language must be constructive and forward-looking.
-
-Crucially, for every developmental point, you must explain the benefit or impact of the improvement. Answer the "why" for the candidate (e.g., "...to enhance your influence," "...to support long-term success").
-
-General Rules:
-
-All 4 competencies MUST be addressed in the summary across the two paragraphs.
-
-The language must be formal, professional, and developmental. Use American English spellings.
-
-All punctuation must be used correctly.
-
-TONE AND STYLE
-Tone: Constructive, formal, objective, and professional.
-
-Voice: Second-person ("You displayed strengths in...").
-
-Language: Use impactful, professional action verbs (e.g., "exhibit," "demonstrate," "foster," "drive"). Avoid generic or weak phrases.
-
-Narrative Flow: Create an integrated narrative. Use transition words and connecting phrases (In conjunction with, Coupled with, Building on this, Similarly) to link ideas between competencies. Do not simply list each competency; synthesize the results into a cohesive summary.
-
-THINGS TO REMEMBER
-NO specific development actions (e.g., "take a course on X"). Suggest the area of focus or type of action (e.g., "exploring different problem-solving methodologies"), not the literal method.
-
-NO reference to technical or industry-specific details. The summary is purely on the behavioural indicators.
-
-NO assumptions. Base the summary only on the scores and the meaning of the competencies.
-
-Even when no specific strengths are identified (see Special Cases), the report must be written in a constructive and positive manner.
-
-SPECIAL CASES (CRITICAL)
-If no competency scores are above 2: The summary should treat all competencies as development areas. Only generate the second paragraph, starting with the standard developmental sentence. Be sure to explain the "why" for each point.
-
-If all competency scores are 3: Treat all competencies as potential areas of effectiveness. The first paragraph MUST begin with "As part of the assessment center, you displayed potential strengths across all key competencies, reflecting scope for further development." It should substantiate the potential observed with behavioral details. The second paragraph must provide specific, actionable development suggestions (e.g., exploring specific frameworks, cultivating a proactive approach) and connect them to tangible business outcomes.
-
-If no competency scores are below 4: Treat all competencies as strengths. The second paragraph must be re-framed to be more concrete and focus on leadership amplification. It should suggest how to leverage these strengths further to role-model behaviors, mentor others, or enhance their organizational impact.
-
-INPUT FORMAT
-You will receive the candidate's data in a simple key-value format as follows:
-
-Candidate Name: [Name]
-Competencies:
-- Leads Inspirationally: [Score]
-- Manages and Solves Problems: [Score]
-- Plans and Thinks Strategically: [Score]
-- Manages Change: [Score]
-
-OUTPUT FORMAT
-Your output must be a single block of text containing only the two-paragraph executive summary. Do not include any headers, titles, or other text.
-
-GOLD STANDARD EXAMPLES (Revised based on SME Feedback)
-Example 1: Low Scores Profile (Revised)
-Input:
-
-Candidate Name: A
-Competencies:
-- Leads Inspirationally: 2
-- Manages and Solves Problems: 1
-- Plans and Thinks Strategically: 1
-- Manages Change: 2
-
-Output:
-Developmentally, scope exists for you to further develop in all competencies. In regard to Manages and Solves Problems, consider ways to proactively identify and remove hurdles, view challenges and conflicts as opportunities for growth and collaboration, and ensure that conflicts are resolved fairly and constructively. Embracing and effectively Managing Change by developing skills in facilitating change initiatives and guiding others through transitions will support your leadership development. Regarding Leads Inspirationally, reflect on your relationships with colleagues and consider ways to foster an inclusive environment that promotes fairness and respect. When faced with charged situations, focus on understanding the behaviors and motivations of others, and respond with emotionally intelligent behaviors to facilitate effective communication, resolve conflicts, and reduce silos. Building networks and engaging in continuous collaboration will help you gain diverse perspectives and strengthen your influence. Lastly, in relation to Plans and Thinks Strategically, consider how to incorporate proactive planning and risk management into your initiatives, aligning team efforts with organizational strategy. Developing a clear understanding of industry trends, external influences, and future opportunities will enable you to deliver work more efficiently and effectively, supporting long-term success.
-
-Example 2: Moderate Scores Profile (Revised)
-Input:
-
-Candidate Name: B
-Competencies:
-- Leads Inspirationally: 4
-- Manages and Solves Problems: 3
-- Plans and Thinks Strategically: 2
-- Manages Change: 2
-
-Output:
-As part of the assessment center, you displayed strengths in Leads Inspirationally and Manages and Solves Problems. In regard to Leads Inspirationally, you demonstrated ability to create an inclusive environment for all team members and address conflicts in a fair manner, to maintain a cooperative work environment. Similarly, you utilize different interpersonal communication strategies to achieve end goals collaboratively and rely on non-verbal cues to drive forward your perspective in a respectful manner. In conjunction, you continue to build networks with relevant internal and external stakeholders to support delivery of organizational goals. In regard to Manages and Solves Problems, you are able to bring together conflicting information or priorities to identify mutual solutions and ways of working. When faced with hurdles, you display ability to bring together different experts to systematically break down the barriers and continue efforts towards end outcomes. Coupled with your interpersonal effectiveness and communication skills, you are able to influence stakeholders with varying priorities to align on mutual solutions.
-
-Developmentally, scope exists for you to further develop in Plans and Thinks Strategically and in Manages Change. In regard to Plans and Thinks Strategically, consider how you can incorporate proactive planning, risk management and strategic objectives when leading an initiative. Identify how you can align the team’s actions and goals with the organization’s strategy, to delivery against organizational vision. Proactive consideration of potential external threats and/or opportunities would enable you to deliver work with great efficiency and effectiveness. Similarly, developing an understanding of the industry dynamics, key current and future trends, and awareness of external factors that can impact your organization and ways of working is critical. In regard to Manages Change, when faced with changing circumstances, consider the need and benefits of this change and communicate this with your team members. Develop openness to change in the workplace and identify how you can contribute towards the implementation of change programs, including training, communication, rewards and resource plans.
-
-Example 3: High Scores Profile (Revised)
-Input:
-
-Candidate Name: C
-Competencies:
-- Leads Inspirationally: 4
-- Manages and Solves Problems: 4
-- Plans and Thinks Strategically: 5
-- Manages Change: 4
-
-Output:
-As part of the assessment center, you displayed strengths across all competencies, demonstrating a high level of effectiveness and professionalism. In Leads Inspirationally, you consistently create an inclusive environment by fostering open communication, encouraging diverse perspectives, and demonstrating genuine respect for others. Your ability to motivate and influence others positively is evident through your capacity to build trust, promote collaboration, and set a compelling vision that inspires your team to achieve shared goals. In Manages and Solves Problems, you exhibit strong analytical thinking and sound judgment, systematically breaking down complex issues, evaluating options thoroughly, and making well-informed decisions. Your proactive approach to identifying solutions and your resilience in overcoming obstacles contribute significantly to your team’s success. Regarding Plans and Thinks Strategically, you demonstrate a clear understanding of organizational priorities, linking your team’s objectives to broader strategic goals. Your ability to anticipate potential risks and opportunities, develop contingency plans, and communicate a compelling vision ensures alignment and sustained progress. Lastly, in Manages Change, you show resilience and adaptability by embracing new initiatives, communicating effectively about change, and supporting others through transitions.
-
-Overall, your consistent demonstration of these competencies positions you as a highly effective leader and a role model for others. Continuing to leverage and role model these strengths will further enhance your influence and impact within your organization.
-
-Example 4: Tie Scores Profile (NEWLY REVISED)
-Input:
-
-Candidate Name: D
-Competencies:
-- Leads Inspirationally: 3
-- Manages and Solves Problems: 3
-- Plans and Thinks Strategically: 3
-- Manages Change: 3
-
-Output:
-As part of the assessment center, you displayed potential strengths across all key competencies, reflecting scope for further development. In Leads Inspirationally, you show the capacity to foster an inclusive environment and build relationships with your team members, demonstrating an understanding of their individual needs and motivations. In Manages and Solves Problems, you demonstrate a natural aptitude for analyzing issues, identifying root causes, and exploring potential solutions. In Plans and Thinks Strategically, you exhibit an awareness of organizational priorities and their connection to individual tasks as you have demonstrated your ability to break down objectives into actionable steps while planning and prioritizing effectively. Additionally, your capacity to Manage Change suggests an openness to organizational transitions and a willingness to adapt to new circumstances and processes.
-
-Developmentally, you can deepen these competencies by engaging in targeted opportunities for growth. In Leads Inspirationally, strengthening your communication skills through active listening will enhance your influence and create a more collaborative team environment. In Manages and Solves Problems, exploring different problem-solving methodologies and decision-making frameworks will further develop your ability to identify and implement effective solutions. As for Plans and Thinks Strategically, expanding your external awareness and incorporating long-term vision into your planning will allow you to contribute more strategically to the organization's success. Additionally, when Managing Change, cultivating a more proactive approach by anticipating potential challenges and developing strategies to mitigate them will enhance your ability to lead and support others through periods of transition. Focusing on these areas will position you as a more effective leader, capable of driving positive change and achieving organizational goals.
-
-
-
-"""
-
+# Rows rendered per page of the preview and results tables
+PAGE_SIZE = 50
+# Seconds between appends of finished rows to the export files while a job runs
+EXPORT_INTERVAL = 1.0
 
 # --- Functions ---
 
-def get_gemini_model():
-    """Initializes and returns the Gemini Pro model."""
+@st.cache_resource
+def get_backend(api_key, transport=None, warm_up=True):
+    """
+    Creates one Gemini client per process and key, shared by every session and run so its connection
+    stays open between requests. With `warm_up`, the SDK import and the first connection happen on a
+    background thread instead of inside the first request.
+    """
+    backend = GeminiBackend(api_key, transport=transport)
+    if warm_up:
+        backend.start_warm_up()
+    return backend
+
+def get_gemini_backend():
+    """Returns the shared Gemini backend."""
     try:
         # This is more robust for deployment
         api_key = st.secrets.get("GEMINI_API_KEY")
         if not api_key:
             st.error("GEMINI_API_KEY secret is not set. Please add it to your Streamlit Cloud secrets.", icon="🔑")
             return None
-        genai.configure(api_key=api_key)
-        # Use the latest stable 1.5 Pro model
-        return genai.GenerativeModel('gemini-2.5-pro')
+        warm_up = str(get_secret("GEMINI_WARM_UP", True)).lower() not in ('false', '0', 'no')
+        return get_backend(api_key, get_secret("GEMINI_TRANSPORT"), warm_up)
     except Exception as e:
         st.error(f"Error initializing the AI model: {e}", icon="🚨")
         return None
 
-def generate_summary(model, candidate_data, competency_cols):
-    """Generates a summary for a single candidate using the master prompt."""
-    if not model:
-        return "Error: AI model not initialized."
-
-    # Format the candidate's scores into a string for the prompt
-    competency_str = "\n".join([f"- {col}: {candidate_data[col]}" for col in competency_cols])
-    
-    # This is the final prompt sent to the API
-    final_prompt = f"{MASTER_PROMPT}\n\nHere is the data for the candidate you need to analyze:\n\n```\nCandidate Name: {candidate_data['Candidate Name']}\nCompetencies:\n{competency_str}\n```"
-    
+@st.cache_resource(max_entries=32, ttl=60 * 60)
+def get_upload_columns(digest, file_name, _data):
+    """Reads an upload's column names once per file content."""
+    return read_columns(_data, file_name)
+
+@st.cache_resource(max_entries=16, ttl=60 * 60)
+def get_candidates(digest, file_name, name_col, competency_cols, _data):
+    """
+    Parses the selected columns of an upload once per file content and column selection.
+
+    The frame is shared by every rerun and session that uploads the same file, so it must be treated
+    as read-only; results are built with `assign` rather than by adding columns to it.
+    """
+    return load_table(_data, file_name, name_col, list(competency_cols))
+
+def get_upload_digest(uploaded_file):
+    """Hashes an upload's content once per upload rather than on every rerun."""
+    if st.session_state.get('upload_file_id') != uploaded_file.file_id:
+        st.session_state.upload_digest = content_hash(uploaded_file.getvalue())
+        st.session_state.upload_file_id = uploaded_file.file_id
+    return st.session_state.upload_digest
+
+def page_slice(total_rows, key, page_size=PAGE_SIZE):
+    """Shows a page picker for a table of `total_rows` rows and returns the slice of the selected page."""
+    pages = max(1, -(-total_rows // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, value=1, key=f"{key}_{pages}")
+    start = (page - 1) * page_size
+    st.caption(f"Rows {min(start + 1, total_rows)}-{min(start + page_size, total_rows)} of {total_rows}")
+    return slice(start, start + page_size)
+
+@st.cache_resource
+def get_summary_cache():
+    """Opens the on-disk summary cache once per process."""
+    return SummaryCache(get_secret("SUMMARY_CACHE_PATH", DEFAULT_CACHE_PATH))
+
+@st.cache_resource
+def get_job_manager():
+    """
+    Creates the process-wide job manager shared by every session.
+
+    All sessions use the same GEMINI_API_KEY, so the quota and the request pool are configured once
+    from secrets rather than per session.
+    """
+    scheduler = FairScheduler(
+        get_engine_setting("GEMINI_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE),
+        get_engine_setting("GEMINI_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE),
+    )
+    return JobManager(scheduler, max_workers=get_engine_setting("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_WORKERS))
+
+def run_generation_job(job, generation_engine, backend, df, name_col, competency_cols,
+                       max_attempts=DEFAULT_MAX_ATTEMPTS, **options):
+    """
+    Background job body: generates every summary, appends finished rows to the export files and
+    regenerates the ones that fail validation. Returns the exporter, run stats and metrics.
+
+    The whole frame is generated in one run, so requests keep flowing however the rows finish. Each
+    summary is validated as it arrives and its row is exported, with any issues, once every row before
+    it has finished, so the saved results grow throughout the run. Failing rows are regenerated once
+    generation ends and rewritten in the export. A cancelled job still saves every finished row.
+    """
+    metrics = RunMetrics(backend.model_name)
+    exporter = ResultExporter(
+        list(df.columns) + [SUMMARY_COLUMN, VALIDATION_COLUMN], wide_columns=(SUMMARY_COLUMN, VALIDATION_COLUMN)
+    )
+    job.cleanup.append(exporter.discard)
+    job.exporter = exporter
+    profiles = classify_profiles(df, competency_cols)
+    profile_cases, development_areas = profiles['profile_case'].tolist(), profiles['development_areas'].tolist()
+    positions = {row: i for i, row in enumerate(df.index)}
+    # Row positions -> (summary, violations), for rows finished but not yet exported
+    finished = {}
+    # Row positions of exported rows that failed validation -> their position in the export
+    invalid_rows = {}
+    state = {'next_row': 0, 'exported_at': 0.0}
+
+    def export_finished(everything=False):
+        """Appends the finished rows that follow the last exported one; with `everything`, also those past gaps."""
+        if everything:
+            rows = sorted(finished)
+        else:
+            rows = []
+            while state['next_row'] + len(rows) in finished:
+                rows.append(state['next_row'] + len(rows))
+        if not rows:
+            return
+        results = [finished.pop(i) for i in rows]
+        for offset, (i, (_, issues)) in enumerate(zip(rows, results)):
+            if issues:
+                invalid_rows[i] = exporter.rows + offset
+        exporter.write(df.iloc[rows].assign(**{
+            SUMMARY_COLUMN: [summary for summary, _ in results],
+            VALIDATION_COLUMN: [format_issues(issues) for _, issues in results],
+        }))
+        state['next_row'] = rows[-1] + 1
+        state['exported_at'] = time.monotonic()
+        job.update_progress(exporter.rows, len(df))
+
+    def on_result(rows, text, final):
+        job.update_outputs(rows, text, final)
+        if final:
+            # Final results arrive on this thread, so the buffer needs no lock
+            for row in rows:
+                i = positions[row]
+                finished[i] = (text, validate_summary(
+                    text, competency_cols, profile_cases[i], bool(development_areas[i])
+                ))
+            if time.monotonic() - state['exported_at'] >= EXPORT_INTERVAL:
+                export_finished()
+
     try:
-        generation_config = genai.types.GenerationConfig(candidate_count=1, temperature=0.7)
-        safety_settings = {
-            'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-            'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-            'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-            'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
-        }
-        response = model.generate_content(final_prompt, generation_config=generation_config, safety_settings=safety_settings)
-        return response.text.strip()
-    except Exception as e:
-        return f"An error occurred while generating the summary: {e}"
+        summaries, stats = generate_summaries(
+            backend, df, name_col, competency_cols, generation_engine,
+            metrics=metrics, on_result=on_result, **options
+        )
+        export_finished()
+        invalid = sorted(invalid_rows)
+        regenerated, violations, validation_stats = regenerate_invalid(
+            backend, df.iloc[invalid], name_col, competency_cols, generation_engine,
+            [summaries[i] for i in invalid], cache=options.get('cache'), max_attempts=max_attempts,
+            compact_prompts=options.get('compact_prompts', False), metrics=metrics, on_result=job.update_outputs,
+        )
+        exporter.replace_rows({
+            invalid_rows[i]: {SUMMARY_COLUMN: summary, VALIDATION_COLUMN: format_issues(issues)}
+            for i, summary, issues in zip(invalid, regenerated, violations) if summary != summaries[i]
+        })
+    except GenerationCancelled:
+        # Keep every row already paid for, even those past rows that never finished
+        export_finished(everything=True)
+        raise
+    finally:
+        exporter.close()
+    metrics.finish()
+    # The results live on disk from here on
+    job.outputs = {}
+    totals = {**stats, **{key: validation_stats[key] for key in ('invalid_rows', 'regenerated', 'still_invalid')}}
+    return exporter, totals, metrics
+
+def partial_results(df, outputs):
+    """Returns `df` with each row's status and its summary so far, for the live results table."""
+    summaries, statuses = [], []
+    for row in df.index:
+        text, final = outputs.get(row, ('', False))
+        summaries.append(text)
+        statuses.append("✅ Done" if final else "✍️ Writing..." if text else "⏳ Waiting")
+    results = df.assign(**{'Executive Summary': summaries})
+    results.insert(0, 'Status', statuses)
+    return results
+
+def get_secret(key, default=None):
+    """Reads an optional setting from Streamlit secrets, falling back to `default` when none are configured."""
+    try:
+        return st.secrets.get(key, default)
+    except Exception:
+        return default
+
+def get_engine_setting(key, default):
+    """Reads an optional numeric engine setting from Streamlit secrets."""
+    try:
+        return int(get_secret(key, default))
+    except (TypeError, ValueError):
+        return default
 
 # --- Initialize Session State ---
 if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = False
-if 'df' not in st.session_state:
-    st.session_state.df = None
+if 'upload_digest' not in st.session_state:
+    st.session_state.upload_digest = None
 if 'name_col' not in st.session_state:
     st.session_state.name_col = ''
 if 'competency_cols' not in st.session_state:
     st.session_state.competency_cols = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
 
 
 # --- Streamlit App UI ---
 st.title("✍️ AI Executive Summary Generator")
-st.markdown("This tool uses AI to create professional executive summaries based on candidate competency scores. Please upload an Excel file to begin.")
+st.markdown("This tool uses AI to create professional executive summaries based on candidate competency scores. Please upload an Excel, CSV or Parquet file to begin.")
 
 # Sidebar for instructions
 with st.sidebar:
     st.header("📋 Instructions")
     st.markdown("""
-    1.  **Prepare & Upload File:** Create an Excel file (.xlsx) with columns for `Candidate Name` and the four competencies. Upload it below.
+    1.  **Prepare & Upload File:** Create an Excel (.xlsx), CSV or Parquet file with columns for `Candidate Name` and the four competencies. Upload it below.
     2.  **Verify Columns:** Use the form to confirm the correct columns for names and scores, then click 'Confirm Selections'.
     3.  **Generate:** Click the 'Generate Executive Summaries' button that appears.
-    4.  **Review & Download:** The results will appear in a table, ready for download as a CSV file.
+    4.  **Review & Download:** The results will appear in a table, ready for download as an Excel, CSV or Parquet file.
     """)
     st.info("Your API Key is securely managed via Streamlit secrets.", icon="ℹ️")
 
+    st.header("🗄️ Summary Cache")
+    summary_cache = get_summary_cache()
+    st.markdown(f"**{len(summary_cache)}** cached score profiles.")
+    if st.button("Clear Summary Cache"):
+        summary_cache.clear()
+        st.success("Cache cleared. New runs will regenerate every summary.")
+
 # File Uploader
 uploaded_file = st.file_uploader(
-    "Choose an Excel file (.xlsx)",
-    type="xlsx",
-    help="The Excel file should contain one row per candidate."
+    "Choose an Excel, CSV or Parquet file",
+    type=UPLOAD_TYPES,
+    help="The file should contain one row per candidate."
 )
 
 if uploaded_file is not None:
     try:
-        # Load data and store in session state to persist it
-        df = pd.read_excel(uploaded_file)
-        st.session_state.df = df
+        # Only the header is read here; the selected columns are parsed once the selection is confirmed
+        all_cols = get_upload_columns(get_upload_digest(uploaded_file), uploaded_file.name, uploaded_file.getbuffer())
         st.success("✅ File uploaded successfully!")
         
         st.subheader("1. Verify Data Columns")
         st.markdown("Please confirm that the columns from your file are correctly identified below.")
         
-        all_cols = st.session_state.df.columns.tolist()
         
         # Automatically find the name and competency columns based on expected names
         default_name_col = 'Candidate Name' if 'Candidate Name' in all_cols else all_cols[0]
-        expected_competencies = [
-            'Leads Inspirationally', 'Manages and Solves Problems', 
-            'Plans and Thinks Strategically', 'Manages Change'
-        ]
-        default_competency_cols = [c for c in expected_competencies if c in all_cols]
+        default_competency_cols = [c for c in EXPECTED_COMPETENCIES if c in all_cols]
 
         with st.form(key='columns_form'):
             name_col = st.selectbox("Candidate Name Column:", all_cols, index=all_cols.index(default_name_col))
@@ -287,60 +296,213 @@ if uploaded_file is not None:
 
     except Exception as e:
         st.error(f"An error occurred while loading the file: {e}", icon="🚨")
-        st.error("Please ensure your Excel file is formatted correctly and not corrupted.")
+        st.error("Please ensure your file is formatted correctly and not corrupted.")
         st.session_state.data_loaded = False # Reset state on error
 
 # This block now runs independently of the form submission, checking session state instead
-if st.session_state.data_loaded:
+candidates = None
+if st.session_state.data_loaded and uploaded_file is not None:
+    try:
+        candidates = get_candidates(
+            st.session_state.upload_digest, uploaded_file.name,
+            st.session_state.name_col, tuple(st.session_state.competency_cols), uploaded_file.getbuffer()
+        )
+    except Exception as e:
+        st.error(f"An error occurred while reading the selected columns: {e}", icon="🚨")
+
+if candidates is not None:
     st.subheader("2. Review Uploaded Data")
-    st.dataframe(st.session_state.df[[st.session_state.name_col] + st.session_state.competency_cols])
+    st.dataframe(candidates.iloc[page_slice(len(candidates), 'preview_page')])
 
     st.subheader("3. Generate Summaries")
-    if st.button("✨ Generate Executive Summaries", type="primary"):
-        model = get_gemini_model()
-        if model:
-            # Use data from session state
-            df_to_process = st.session_state.df.copy()
-            name_col = st.session_state.name_col
-            competency_cols = st.session_state.competency_cols
-            
-            summaries = []
-            progress_bar = st.progress(0, text="Initializing generation...")
-            
-            total_rows = len(df_to_process)
-            for i, row in df_to_process.iterrows():
-                # For the function, ensure the name column is what it expects
-                temp_row = row.rename({name_col: 'Candidate Name'})
-                
-                status_text = f"Processing candidate: {row[name_col]} ({i+1}/{total_rows})"
-                progress_bar.progress((i + 1) / total_rows, text=status_text)
-                
-                summary = generate_summary(model, temp_row, competency_cols)
-                summaries.append(summary)
-                
-                time.sleep(1) # A small delay to be kind to the API
-            
-            progress_bar.progress(1.0, text="✅ Generation complete!")
-            df_to_process['Executive Summary'] = summaries
+    job_manager = get_job_manager()
+    # Create the shared client now, so it is ready by the time the user clicks Generate
+    if get_secret("GEMINI_API_KEY"):
+        get_gemini_backend()
+    with st.expander("⚙️ Generation Settings"):
+        max_workers = st.number_input(
+            "Concurrent requests for this job", min_value=1, max_value=job_manager.max_workers,
+            value=job_manager.max_workers
+        )
+        st.caption(
+            f"The API key's quota of {job_manager.scheduler.limiter.requests.capacity:,.0f} requests and "
+            f"{job_manager.scheduler.limiter.tokens.capacity:,.0f} tokens per minute is shared fairly by "
+            f"everyone using this app ({len(job_manager.active_jobs())} job(s) currently active)."
+        )
+        batch_size = st.number_input(
+            "Candidates per request", min_value=1, max_value=MAX_BATCH_SIZE, value=DEFAULT_BATCH_SIZE,
+            help="Send several candidates in one request to avoid repeating the full prompt. Set to 1 to disable batching."
+        )
+        compact_prompts = st.checkbox(
+            "Use compact profile-specific prompts", value=True,
+            help="Send only the rules and gold-standard example that apply to each candidate's score profile."
+        )
+        if compact_prompts:
+            st.caption("Estimated prompt size per profile case:")
+            st.dataframe(variant_report(MASTER_PROMPT), hide_index=True)
+        use_cache = st.checkbox(
+            "Reuse summaries for identical score profiles", value=True,
+            help="Candidates with the same scores share one summary, and summaries from earlier runs are reused. "
+                 "Uncheck to sample a fresh text for every candidate."
+        )
+        max_attempts = st.number_input(
+            "Regeneration attempts for invalid summaries", min_value=0, max_value=5, value=DEFAULT_MAX_ATTEMPTS,
+            help="Summaries that break the required structure, length or competency naming, or that failed "
+                 "with an error, are regenerated individually up to this many times."
+        )
+
+    # A job's results only line up with the rows of the upload and columns it was started from
+    source = (st.session_state.upload_digest, st.session_state.name_col, tuple(st.session_state.competency_cols))
+    job = job_manager.get(st.session_state.job_id) if st.session_state.job_id else None
+    if job is not None and job.source != source:
+        # The upload or selection changed since; stop the job and forget it
+        job.cancel()
+        st.session_state.job_id = None
+        job = None
+    job_active = job is not None and not job.finished
+
+    if st.button("✨ Generate Executive Summaries", type="primary", disabled=job_active):
+        backend = get_gemini_backend()
+        if backend:
+            # Session state is not available on the job thread, so bind the selections now
+            name_col, competency_cols = st.session_state.name_col, list(st.session_state.competency_cols)
+            job = job_manager.submit(
+                lambda job, generation_engine: run_generation_job(
+                    job, generation_engine, backend, candidates, name_col, competency_cols,
+                    cache=summary_cache if use_cache else None,
+                    batch_size=batch_size,
+                    compact_prompts=compact_prompts,
+                    max_attempts=max_attempts,
+                ),
+                owner=st.session_state.session_id,
+                label=uploaded_file.name,
+                max_workers=max_workers,
+                source=source,
+            )
+            st.session_state.job_id = job.id
+
+    if job is not None:
+        if job.status in (QUEUED, RUNNING):
+            outputs = dict(job.outputs)
+            finished_rows = sum(1 for _, final in outputs.values() if final)
+            if job.status == QUEUED:
+                st.progress(0.0, text="Waiting for a free job slot...")
+            else:
+                st.progress(
+                    finished_rows / len(candidates),
+                    text=f"{finished_rows}/{len(candidates)} summaries finished; {job.done} candidates checked and saved"
+                )
+            st.caption("Generation runs in the background; you can keep using the page while it works.")
+            if st.button("⏹️ Cancel Generation"):
+                job.cancel()
+
+            # Show every summary as it streams in; finished rows can be downloaded at any point
+            st.subheader("4. Results (in progress)")
+            st.caption(f"{finished_rows} of {len(candidates)} summaries finished.")
+            rows = page_slice(len(candidates), 'live_results_page')
+            st.dataframe(partial_results(candidates.iloc[rows], outputs))
+            if job.exporter is not None and job.exporter.rows:
+                # Served from the CSV the job appends to, and only read when clicked
+                st.download_button(
+                    label=f"📥 Download {job.exporter.rows} Saved Results as CSV",
+                    data=job.exporter.reader(CSV),
+                    file_name='Executive_Summaries_Partial_Output.csv',
+                    mime=MIME_TYPES[CSV],
+                )
+            # Poll the job until it finishes
+            time.sleep(1)
+            st.rerun()
+
+        elif job.status == CANCELLED:
+            st.warning("Generation was cancelled.", icon="⏹️")
+            if job.exporter is not None and job.exporter.rows:
+                st.download_button(
+                    label=f"📥 Download {job.exporter.rows} Saved Results as CSV",
+                    data=job.exporter.reader(CSV),
+                    file_name='Executive_Summaries_Partial_Output.csv',
+                    mime=MIME_TYPES[CSV],
+                )
+
+        elif job.status == FAILED:
+            st.error(f"Generation failed: {job.error}", icon="🚨")
+
+        elif job.status == DONE:
+            exporter, stats, metrics = job.result
+            st.progress(1.0, text="✅ Generation complete!")
+            st.caption(
+                f"{stats['rows']} candidates, {stats['unique_profiles']} unique score profiles: "
+                f"{stats['cache_hits']} served from cache, {stats['api_calls']} API calls. "
+                f"{stats['invalid_rows']} failed validation ({stats['regenerated']} rows regenerated)."
+            )
+            if stats['still_invalid']:
+                st.warning(
+                    f"{stats['still_invalid']} summaries still fail validation; see the "
+                    f"'{VALIDATION_COLUMN}' column before sharing them.", icon="⚠️"
+                )
             
             st.subheader("4. Results")
-            st.dataframe(df_to_process)
-            
-            # Convert DataFrame to CSV in-memory for download
-            output = io.BytesIO()
-            df_to_process.to_csv(output, index=False, encoding='utf-8-sig')
-            csv_data = output.getvalue()
-
-            st.download_button(
-                label="📥 Download Results as CSV",
-                data=csv_data,
-                file_name='Executive_Summaries_Output.csv',
+            # Only the visible page is read back from the Parquet export
+            rows = page_slice(exporter.rows, 'results_page')
+            st.dataframe(exporter.read_rows(rows.start, rows.stop))
+
+            # Downloads are read from the export files only when clicked
+            download_cols = st.columns(3)
+            for column, (fmt, label) in zip(download_cols, [
+                (XLSX, "📥 Download Results as Excel"),
+                (CSV, "📥 Download Results as CSV"),
+                (PARQUET, "📥 Download Results as Parquet"),
+            ]):
+                column.download_button(
+                    label=label,
+                    data=exporter.reader(fmt),
+                    file_name=f'Executive_Summaries_Output.{fmt}',
+                    mime=MIME_TYPES[fmt],
+                )
+
+            st.markdown("**Run Metrics**")
+            run_summary = metrics.summary()
+            metric_cols = st.columns(5)
+            metric_cols[0].metric("API Calls", run_summary['api_calls'], help=f"{run_summary['failed_calls']} failed after retries")
+            metric_cols[1].metric("Retries", run_summary['retries'])
+            metric_cols[2].metric("Tokens", f"{run_summary['prompt_tokens'] + run_summary['output_tokens']:,}")
+            metric_cols[3].metric("Estimated Cost", f"${run_summary['estimated_cost_usd']:.2f}")
+            metric_cols[4].metric(
+                "Latency p50 / p95", f"{run_summary['latency_p50_s']:.1f}s / {run_summary['latency_p95_s']:.1f}s",
+                help=f"Mean queue wait {run_summary['queue_wait_mean_s']:.1f}s; wall time {run_summary['wall_time_s']:.0f}s"
+            )
+            if run_summary['api_calls']:
+                st.caption("Request latency distribution")
+                st.bar_chart(metrics.latency_histogram())
+                st.caption("Slowest rows")
+                st.dataframe(metrics.slowest_rows(), hide_index=True)
+
+            export_cols = st.columns(3)
+            export_cols[0].download_button(
+                label="📊 Per-Row Metrics (CSV)",
+                data=metrics.rows_frame().to_csv(index=False).encode('utf-8'),
+                file_name='Executive_Summaries_Metrics.csv',
                 mime='text/csv',
             )
+            export_cols[1].download_button(
+                label="🧾 Request Log (JSON Lines)",
+                data=metrics.to_jsonl().encode('utf-8'),
+                file_name='Executive_Summaries_Metrics.jsonl',
+                mime='application/jsonl',
+            )
+            export_cols[2].download_button(
+                label="📈 Prometheus Metrics",
+                data=metrics.to_prometheus().encode('utf-8'),
+                file_name='Executive_Summaries_Metrics.prom',
+                mime='text/plain',
+            )
 
 if uploaded_file is None:
-    st.info("Awaiting Excel file upload...")
-    # Clear state if file is removed
-    for key in ['data_loaded', 'df', 'name_col', 'competency_cols']:
+    st.info("Awaiting file upload...")
+    # Clear state if file is removed, stopping any generation still running for it
+    if st.session_state.get('job_id'):
+        abandoned_job = get_job_manager().get(st.session_state.job_id)
+        if abandoned_job is not None:
+            abandoned_job.cancel()
+    for key in ['data_loaded', 'upload_digest', 'upload_file_id', 'name_col', 'competency_cols', 'job_id']:
         if key in st.session_state:
             del st.session_state[key]
@@ -0,0 +1,274 @@
+"""LLM backends: the interface the pipeline generates through, the Gemini client and an offline simulator."""
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+
+# --- Gemini Settings ---
+GEMINI_MODEL_NAME = 'gemini-2.5-pro'
+SAFETY_SETTINGS = {
+    'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+    'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+    'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+    'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
+}
+
+
+# --- Interface ---
+
+class GenerationResult:
+    """The text of one response plus the token usage the backend reported for it."""
+
+    def __init__(self, text, prompt_tokens=0, output_tokens=0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+
+
+class LLMBackend:
+    """
+    Interface for the model the pipeline generates through.
+
+    `generate` returns a `GenerationResult` and raises on API failures; errors that carry an HTTP-style
+    `code` of 429 or 5xx are retried by the engine. `model_name` is part of every cache key.
+    """
+
+    model_name = None
+
+    def generate(self, prompt, config):
+        raise NotImplementedError
+
+    def generate_stream(self, prompt, config, on_text):
+        """
+        Like `generate`, but calls `on_text(text_so_far)` as the response arrives.
+
+        Backends that cannot stream report the whole text once it is complete.
+        """
+        result = self.generate(prompt, config)
+        on_text(result.text)
+        return result
+
+
+def _genai():
+    # The SDK takes about half a second to import, so it is only loaded once a client is needed
+    import google.generativeai as genai
+
+    return genai
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Generates through the Google Gemini API.
+
+    The SDK is imported and the client created on first use, and the client is then shared by every
+    request, so one instance should be reused for the life of the process. Its default gRPC transport
+    keeps a single HTTP/2 channel open and multiplexes concurrent requests over it; `transport='rest'`
+    uses a pooled keep-alive HTTP session instead.
+    """
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL_NAME, transport=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.transport = transport
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    genai = _genai()
+                    options = {'transport': self.transport} if self.transport else {}
+                    genai.configure(api_key=self.api_key, **options)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def warm_up(self):
+        """Creates the client and opens its connection with a count_tokens call, which is not billed."""
+        self.model.count_tokens("warm-up")
+
+    def start_warm_up(self):
+        """Warms up on a background thread; failures are left for the first real request to report."""
+        def run():
+            try:
+                self.warm_up()
+            except Exception:
+                pass
+        thread = threading.Thread(target=run, name='gemini-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def _result(self, text, response):
+        usage = getattr(response, 'usage_metadata', None)
+        return GenerationResult(
+            text.strip(),
+            getattr(usage, 'prompt_token_count', 0) or 0,
+            getattr(usage, 'candidates_token_count', 0) or 0,
+        )
+
+    def generate(self, prompt, config):
+        generation_config = _genai().types.GenerationConfig(**config)
+        response = self.model.generate_content(prompt, generation_config=generation_config, safety_settings=SAFETY_SETTINGS)
+        return self._result(response.text, response)
+
+    def generate_stream(self, prompt, config, on_text):
+        generation_config = _genai().types.GenerationConfig(**config)
+        response = self.model.generate_content(
+            prompt, generation_config=generation_config, safety_settings=SAFETY_SETTINGS, stream=True
+        )
+        text = ''
+        for chunk in response:
+            # The closing chunk may carry only the finish reason and usage, with no text parts
+            if chunk.parts:
+                text += chunk.text
+                on_text(text)
+        # Once iterated, the streamed response aggregates the usage metadata of the whole reply
+        return self._result(text, response)
+
+
+# --- Simulation ---
+
+class SimulatedAPIError(Exception):
+    """A fake API failure carrying an HTTP status `code`, so the engine treats it like the real thing."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+CANDIDATE_BLOCK = re.compile(r'(?:Candidate ID: (\S+)\n)?Candidate Name: [^\n]*\nCompetencies:\n((?:- [^\n]+\n?)+)')
+SCORE_LINE = re.compile(r'^- (.+): (\S+)\s*$', re.MULTILINE)
+# Share of a simulated response's latency spent before the first token, and the chunks the rest arrives in
+FIRST_TOKEN_SHARE = 0.2
+STREAM_CHUNKS = 8
+FILLER_WORDS = (
+    "you demonstrate consistent behaviors that support collaboration, clear communication and "
+    "sound judgment across a range of situations"
+).split()
+
+
+class SimulatedBackend(LLMBackend):
+    """
+    An offline stand-in for Gemini with configurable latency, failures, quota and output length.
+
+    Latency is log-normal around `latency_median` seconds. Each call fails with a 429 with probability
+    `rate_limit_rate` and with a 503 with probability `error_rate`; exceeding `tokens_per_minute` over a
+    sliding minute also returns a 429. With probability `invalid_rate`, a summary opens with the wrong
+    sentence, so output validation and regeneration can be exercised. Responses follow the summary
+    structure for the scores in the prompt, and batch prompts get a JSON array, so the whole pipeline
+    can run against it. Failures surface at the first token; streamed text then arrives in even chunks
+    over the rest of the latency.
+    """
+
+    model_name = 'simulated'
+
+    def __init__(self, latency_median=1.0, latency_sigma=0.5, error_rate=0.0, rate_limit_rate=0.0,
+                 tokens_per_minute=None, output_words=300, invalid_rate=0.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.tokens_per_minute = tokens_per_minute
+        self.output_words = output_words
+        self.invalid_rate = invalid_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = deque()
+        self.window_tokens = 0
+        self.calls = 0
+        self.latencies = []
+
+    def _draw(self):
+        with self.lock:
+            self.calls += 1
+            latency = self.random.lognormvariate(0, self.latency_sigma) * self.latency_median
+            return latency, self.random.random()
+
+    def _charge(self, tokens):
+        """Records `tokens` against the sliding one-minute window; returns False if that exceeds the quota."""
+        if not self.tokens_per_minute:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0][0] > 60:
+                self.window_tokens -= self.window.popleft()[1]
+            if self.window_tokens + tokens > self.tokens_per_minute:
+                return False
+            self.window.append((now, tokens))
+            self.window_tokens += tokens
+            return True
+
+    def _summary(self, scores):
+        if not scores:
+            return ''
+        strengths = [name for name, score in scores if score >= 4]
+        potential = [name for name, score in scores if score == 3]
+        development = [name for name, score in scores if score <= 2]
+        if len(potential) == len(scores):
+            paragraphs = [
+                "As part of the assessment center, you displayed potential strengths across all key competencies, "
+                "reflecting scope for further development." + ''.join(f" In {name}, you show clear potential." for name in potential),
+                "Developmentally, you can deepen these competencies by engaging in targeted opportunities for growth.",
+            ]
+        elif len(development) == len(scores):
+            paragraphs = [f"Developmentally, scope exists for you to further develop in {' and '.join(development)}."]
+        else:
+            paragraphs = [
+                f"As part of the assessment center, you displayed strengths in {' and '.join(strengths or potential)}."
+                + ''.join(f" In {name}, you show potential to build further." for name in potential if strengths)
+            ]
+            if development:
+                paragraphs.append(f"Developmentally, scope exists for you to further develop in {' and '.join(development)}.")
+            else:
+                paragraphs.append("Overall, continuing to leverage and role model these strengths will enhance your impact.")
+        # Pad each paragraph towards the configured length
+        with self.lock:
+            invalid = self.random.random() < self.invalid_rate
+        if invalid:
+            paragraphs[0] = f"In summary, {paragraphs[0][0].lower()}{paragraphs[0][1:]}"
+        budget = max(0, self.output_words - sum(len(p.split()) for p in paragraphs)) // len(paragraphs)
+        padding = ' '.join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(budget))
+        return "\n\n".join(f"{p} Overall, {padding}." if padding else p for p in paragraphs)
+
+    def generate(self, prompt, config):
+        return self.generate_stream(prompt, config, None)
+
+    def generate_stream(self, prompt, config, on_text):
+        latency, roll = self._draw()
+        with self.lock:
+            self.latencies.append(latency)
+        time.sleep(latency * FIRST_TOKEN_SHARE)
+        if roll < self.rate_limit_rate:
+            raise SimulatedAPIError(429, "Resource has been exhausted (simulated).")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise SimulatedAPIError(503, "The service is currently unavailable (simulated).")
+
+        data = prompt.rsplit('Here is the data for the', 1)[-1]
+        candidates = []
+        for candidate_id, block in CANDIDATE_BLOCK.findall(data):
+            scores = []
+            for name, score in SCORE_LINE.findall(block):
+                try:
+                    scores.append((name, float(score)))
+                except ValueError:
+                    scores.append((name, 0.0))
+            candidates.append((candidate_id, self._summary(scores)))
+
+        if any(candidate_id for candidate_id, _ in candidates):
+            text = json.dumps([{'candidate_id': cid, 'summary': summary} for cid, summary in candidates])
+        else:
+            text = candidates[0][1] if candidates else ''
+        prompt_tokens = len(prompt) // 4 + 1
+        output_tokens = len(text) // 4 + 1
+        if not self._charge(prompt_tokens + output_tokens):
+            raise SimulatedAPIError(429, "Tokens per minute quota exceeded (simulated).")
+
+        step = max(1, -(-len(text) // STREAM_CHUNKS))
+        for end in range(step, len(text) + step, step):
+            time.sleep(latency * (1 - FIRST_TOKEN_SHARE) / STREAM_CHUNKS)
+            if on_text is not None:
+                on_text(text[:end])
+        return GenerationResult(text, prompt_tokens, output_tokens)
@@ -0,0 +1,141 @@
+"""Multi-candidate prompts that return a JSON array of summaries in one request."""
+import json
+import re
+
+# --- Defaults ---
+DEFAULT_BATCH_SIZE = 5
+MAX_BATCH_SIZE = 20
+
+ID_KEYS = ('candidate_id', 'id', 'candidate', 'Candidate ID')
+SUMMARY_KEYS = ('summary', 'executive_summary', 'Executive Summary', 'text')
+
+BATCH_INSTRUCTIONS = """
+BATCH MODE
+This request contains several candidates. Each candidate is introduced by a "Candidate ID" line followed by the usual input format. Write a separate executive summary for every candidate, following every rule above independently for each one.
+
+Instead of the OUTPUT FORMAT above, return only a JSON array with exactly one object per candidate, in the same order as the input:
+[{"candidate_id": "<Candidate ID>", "summary": "<executive summary>"}]
+Inside each summary, separate the paragraphs with a blank line ("\\n\\n"). Do not add any text outside the JSON array.
+"""
+
+# An entry as instructed, whose summary string may still be open while the response streams in
+PARTIAL_ENTRY = re.compile(r'"candidate_id"\s*:\s*"([^"]*)"\s*,\s*"summary"\s*:\s*"((?:[^"\\]|\\.)*)')
+CODE_FENCE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+
+
+def chunked(items, size):
+    """Splits a list into consecutive chunks of at most `size` items."""
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def candidate_ids(count):
+    """Returns the batch-local IDs used to key candidates in the prompt and the response."""
+    return [f"C{n}" for n in range(1, count + 1)]
+
+
+def build_batch_prompt(master_prompt, candidates, competency_cols):
+    """Builds one prompt for a list of (candidate_id, candidate_data) pairs."""
+    blocks = []
+    for candidate_id, candidate_data in candidates:
+        competency_str = "\n".join([f"- {col}: {candidate_data[col]}" for col in competency_cols])
+        blocks.append(
+            f"Candidate ID: {candidate_id}\nCandidate Name: {candidate_data['Candidate Name']}\nCompetencies:\n{competency_str}"
+        )
+    data = "\n\n".join(blocks)
+    return f"{master_prompt}\n{BATCH_INSTRUCTIONS}\nHere is the data for the candidates you need to analyze:\n\n```\n{data}\n```"
+
+
+# --- Response Parsing ---
+
+def _first_value(entry, keys):
+    for key in keys:
+        if key in entry:
+            return entry[key]
+    return None
+
+
+def _iter_objects(text):
+    """Yields every JSON object that can be decoded from `text`, skipping malformed stretches."""
+    decoder = json.JSONDecoder()
+    position = text.find('{')
+    while position != -1:
+        try:
+            value, end = decoder.raw_decode(text, position)
+        except ValueError:
+            position = text.find('{', position + 1)
+            continue
+        if isinstance(value, dict):
+            yield value
+        position = text.find('{', end)
+
+
+def _decode(text):
+    """Decodes the response as a whole, or from its outermost array, falling back to individual objects."""
+    text = CODE_FENCE.sub('', text.strip())
+    candidates = [text]
+    start, end = text.find('['), text.rfind(']')
+    if start != -1 and end > start:
+        candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return list(_iter_objects(text))
+
+
+def parse_batch_response(text, expected_ids):
+    """
+    Extracts {candidate_id: summary} from a batch response.
+
+    Tolerates code fences, surrounding prose, an object keyed by candidate ID and truncated or
+    partially malformed arrays. Unknown IDs and empty summaries are dropped, so the caller can
+    retry whichever expected IDs are missing.
+    """
+    expected = set(expected_ids)
+    data = _decode(text or '')
+    if isinstance(data, dict):
+        nested = _first_value(data, ('summaries', 'results', 'candidates'))
+        if isinstance(nested, list):
+            data = nested
+        else:
+            data = [{'candidate_id': key, 'summary': value} for key, value in data.items()]
+    if not isinstance(data, list):
+        return {}
+
+    summaries = {}
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        candidate_id = str(_first_value(entry, ID_KEYS) or '').strip()
+        summary = _first_value(entry, SUMMARY_KEYS)
+        if candidate_id in expected and isinstance(summary, str) and summary.strip():
+            summaries.setdefault(candidate_id, summary.strip())
+    return summaries
+
+
+def _decode_fragment(fragment):
+    """Decodes the body of a possibly unterminated JSON string, dropping a trailing partial escape."""
+    for cut in range(0, 6):
+        try:
+            return json.loads(f'"{fragment[:len(fragment) - cut]}"')
+        except ValueError:
+            continue
+    return ''
+
+
+def parse_partial_batch(text, expected_ids):
+    """
+    Extracts {candidate_id: summary so far} from a batch response that is still streaming.
+
+    Only entries written in the instructed order are recognized; `parse_batch_response` remains the
+    authority on the finished response.
+    """
+    expected = set(expected_ids)
+    summaries = {}
+    for candidate_id, fragment in PARTIAL_ENTRY.findall(text or ''):
+        summary = _decode_fragment(fragment).strip()
+        if candidate_id in expected and summary:
+            summaries.setdefault(candidate_id, summary)
+    return summaries
@@ -0,0 +1,157 @@
+"""Offline throughput benchmark for the summary pipeline, driven by the simulated backend.
+
+Generates synthetic cohorts, runs them through the same code path as the app and the CLI, and reports
+throughput, the request latency percentiles and mean queue wait recorded in the run metrics, API calls
+per candidate and peak memory. Compare concurrency, caching, batching and prompt settings without a key
+or any spend:
+
+    python benchmarks/bench_pipeline.py --sizes 100 1000 10000 --workers 8 32 --batch-size 1 5
+    python benchmarks/bench_pipeline.py --sizes 100000 --cache --mode stream
+    python benchmarks/bench_pipeline.py --sizes 500 --latency 2 --rpm 600 --stream-results
+
+With --stream-results, the frame path streams responses the way the app does and also reports the
+time until the first text and the first finished row appear.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from backends import SimulatedBackend  # noqa: E402
+from engine import GenerationEngine, RateLimiter  # noqa: E402
+from metrics import RunMetrics  # noqa: E402
+from pipeline import run_job  # noqa: E402
+from summarizer import EXPECTED_COMPETENCIES, generate_summaries  # noqa: E402
+from summary_cache import SummaryCache  # noqa: E402
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def synthetic_cohort(rows, seed=0):
+    """Returns a DataFrame of `rows` candidates with uniformly random 1-5 scores."""
+    rng = random.Random(seed)
+    data = {'Candidate Name': [f"Candidate {i}" for i in range(rows)]}
+    for col in EXPECTED_COMPETENCIES:
+        data[col] = [rng.randint(1, 5) for _ in range(rows)]
+    return pd.DataFrame(data)
+
+
+def run_case(rows, workers, batch_size, use_cache, compact_prompts, mode, args, workdir):
+    backend = SimulatedBackend(
+        latency_median=args.latency, latency_sigma=args.latency_sigma, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, tokens_per_minute=args.backend_tpm,
+        output_words=args.output_words, seed=args.seed,
+    )
+    engine = GenerationEngine(
+        max_workers=workers, limiter=RateLimiter(args.rpm, args.tpm), base_delay=args.base_delay,
+    )
+    cache = SummaryCache(os.path.join(workdir, f"cache_{rows}_{workers}_{batch_size}.sqlite3")) if use_cache else None
+    options = dict(cache=cache, batch_size=batch_size, compact_prompts=compact_prompts)
+
+    cohort = synthetic_cohort(rows, args.seed)
+    if mode == 'stream':
+        input_path = os.path.join(workdir, f"cohort_{rows}.csv")
+        cohort.to_csv(input_path, index=False)
+        del cohort
+
+    first_output = {}
+
+    def on_result(rows, text, final):
+        first_output.setdefault('final' if final else 'partial', time.perf_counter() - started)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if mode == 'stream':
+        totals = run_job(
+            input_path, os.path.join(workdir, f"out_{rows}.csv"), backend, engine,
+            competency_cols=EXPECTED_COMPETENCIES, resume=False, **options
+        )
+        run_summary = totals['metrics']
+    else:
+        if args.stream_results:
+            options['on_result'] = on_result
+        metrics = RunMetrics(backend.model_name)
+        generate_summaries(backend, cohort, 'Candidate Name', EXPECTED_COMPETENCIES, engine, metrics=metrics, **options)
+        metrics.finish()
+        run_summary = metrics.summary()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'rows': rows,
+        'mode': mode,
+        'workers': workers,
+        'batch_size': batch_size,
+        'cache': use_cache,
+        'compact': compact_prompts,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed else None,
+        # Request latency as the pipeline saw it, including retries and waits between attempts
+        'p50_ms': round(run_summary['latency_p50_s'] * 1000, 1),
+        'p95_ms': round(run_summary['latency_p95_s'] * 1000, 1),
+        'p99_ms': round(run_summary['latency_p99_s'] * 1000, 1),
+        'queue_wait_ms': round(run_summary['queue_wait_mean_s'] * 1000, 1),
+        'api_calls_per_candidate': round(backend.calls / rows, 4),
+        'peak_memory_mb': round(peak / 2 ** 20, 1),
+    }
+    if args.stream_results:
+        result['first_text_s'] = round(first_output.get('partial', first_output.get('final', 0.0)), 3)
+        result['first_row_s'] = round(first_output.get('final', 0.0), 3)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Cohort sizes.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[16], help="Concurrency levels to compare.")
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[1], help="Batch sizes to compare.")
+    parser.add_argument('--cache', action='store_true', help="Enable the score-profile cache (fresh per case).")
+    parser.add_argument('--full-prompt', action='store_true', help="Disable compact profile-specific prompts.")
+    parser.add_argument('--mode', choices=('frame', 'stream'), default='frame',
+                        help="'frame' runs the in-memory app path, 'stream' the chunked CLI pipeline.")
+    parser.add_argument('--stream-results', action='store_true',
+                        help="Stream responses in the frame path and report time to first output.")
+    parser.add_argument('--latency', type=float, default=0.02, help="Median simulated latency in seconds.")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="Log-normal spread of the latency.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a simulated 503.")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Probability of a simulated 429.")
+    parser.add_argument('--backend-tpm', type=int, default=None, help="Simulated server-side tokens per minute.")
+    parser.add_argument('--output-words', type=int, default=300, help="Simulated summary length.")
+    parser.add_argument('--rpm', type=int, default=10_000_000, help="Client-side requests per minute limit.")
+    parser.add_argument('--tpm', type=int, default=10 ** 12, help="Client-side tokens per minute limit.")
+    parser.add_argument('--base-delay', type=float, default=0.05, help="Retry backoff base delay in seconds.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results as JSON lines to this path.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows, workers, batch_size in itertools.product(args.sizes, args.workers, args.batch_size):
+            result = run_case(rows, workers, batch_size, args.cache, not args.full_prompt, args.mode, args, workdir)
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr, flush=True)
+
+    writer = csv.DictWriter(sys.stdout, fieldnames=list(results[0]) if results else [])
+    writer.writeheader()
+    writer.writerows(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(result) + '\n' for result in results)
+
+
+if __name__ == '__main__':
+    main()
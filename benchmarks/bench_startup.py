@@ -0,0 +1,118 @@
+"""Startup benchmark for the app: cold start, first-render latency and first-request latency.
+
+Every measurement runs in a fresh interpreter, so nothing is already imported or cached:
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --repo ../baseline-checkout
+    GEMINI_API_KEY=... python benchmarks/bench_startup.py --first-request
+    GEMINI_API_KEY=... python benchmarks/bench_startup.py --first-request --no-warm-up
+
+cold_start_s is the time from a fresh interpreter to the first page of app.py: importing Streamlit
+and the first script run, which imports whatever app.py needs. first_render_s is that first run alone
+and rerun_s a second run in the same session. Only app.py is run, so --repo can point at any checkout
+of the app, older ones included. The heavy_imports column lists the libraries the first render loaded;
+pandas and the Gemini SDK should not be among them until data is uploaded or a client is needed.
+--first-request times creating the Gemini client and the first and second requests made through it,
+with or without a warm-up call in between; it always uses this checkout's backends module.
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+import textwrap
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'google.generativeai')
+
+# Only Streamlit and app.py are named, so the script also measures trees without the app's later modules
+FIRST_RENDER = textwrap.dedent("""
+    import json, os, sys, time
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join({repo!r}, 'app.py'), default_timeout=60)
+    app.secrets['GEMINI_API_KEY'] = 'benchmark'
+    imported = time.perf_counter()
+    app.run()
+    rendered = time.perf_counter()
+    app.run()
+    rerun = time.perf_counter() - rendered
+    heavy = [name for name in {heavy!r} if name in sys.modules]
+    print(json.dumps({{
+        'cold_start_s': rendered - start, 'first_render_s': rendered - imported, 'rerun_s': rerun,
+        'heavy_imports': ' '.join(heavy) or '-',
+    }}))
+""")
+
+FIRST_REQUEST = textwrap.dedent("""
+    import json, os, sys, time
+    sys.path.insert(0, {repo!r})
+    from backends import GeminiBackend
+    config = {{'temperature': 0, 'max_output_tokens': 8}}
+    start = time.perf_counter()
+    backend = GeminiBackend(os.environ['GEMINI_API_KEY'], transport={transport!r})
+    if {warm_up!r}:
+        backend.warm_up()
+    setup = time.perf_counter() - start
+    start = time.perf_counter()
+    backend.generate("Reply with the word ready.", config)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    backend.generate("Reply with the word ready.", config)
+    second = time.perf_counter() - start
+    print(json.dumps({{'client_setup_s': setup, 'first_request_s': first, 'second_request_s': second}}))
+""")
+
+
+def measure(script, runs, cwd):
+    """Runs `script` in `runs` fresh interpreters in `cwd` and returns the median of each numeric field."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', script], cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {}
+    for key, value in samples[0].items():
+        result[key] = round(statistics.median(s[key] for s in samples), 3) if isinstance(value, float) else value
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help="Fresh processes per measurement; the median is reported.")
+    parser.add_argument('--repo', default=REPO, help="Checkout whose app.py is measured (default: this one).")
+    parser.add_argument('--first-request', action='store_true',
+                        help="Also time real Gemini requests; needs GEMINI_API_KEY and spends a few tokens.")
+    parser.add_argument('--no-warm-up', action='store_true', help="Skip the warm-up call before the first request.")
+    parser.add_argument('--transport', choices=('grpc', 'rest'), help="Gemini transport (default: the SDK's, gRPC).")
+    parser.add_argument('--json', help="Also write the results as JSON lines to this path.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = {'runs': args.runs}
+    result.update(measure(FIRST_RENDER.format(repo=args.repo, heavy=HEAVY_MODULES), args.runs, args.repo))
+    if args.first_request:
+        if not os.environ.get('GEMINI_API_KEY'):
+            print("GEMINI_API_KEY environment variable is not set.", file=sys.stderr)
+            return 2
+        result['warm_up'] = not args.no_warm_up
+        result.update(measure(
+            FIRST_REQUEST.format(repo=REPO, transport=args.transport, warm_up=not args.no_warm_up), args.runs, REPO
+        ))
+
+    writer = csv.DictWriter(sys.stdout, fieldnames=list(result))
+    writer.writeheader()
+    writer.writerow(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Headless command-line entry point for generating executive summaries from large workbooks.
+
+Example:
+    GEMINI_API_KEY=... python cli.py candidates.xlsx -o summaries.csv --workers 16
+
+Re-running the same command after an interruption resumes from the last completed chunk.
+"""
+import argparse
+import os
+import sys
+
+from backends import GeminiBackend
+from batching import DEFAULT_BATCH_SIZE
+from engine import (
+    GenerationEngine, RateLimiter,
+    DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+)
+from pipeline import run_job, read_header, DEFAULT_CHUNK_SIZE
+from summary_cache import SummaryCache, DEFAULT_CACHE_PATH
+from summarizer import EXPECTED_COMPETENCIES
+from validator import DEFAULT_MAX_ATTEMPTS, VALIDATION_COLUMN
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate executive summaries for every candidate in a workbook.")
+    parser.add_argument('input', help="Input .xlsx, .csv or .parquet file with one row per candidate.")
+    parser.add_argument('-o', '--output', help="Output CSV path (default: <input>_summaries.csv).")
+    parser.add_argument('--name-col', default='Candidate Name', help="Candidate name column.")
+    parser.add_argument('--competency', action='append', dest='competency_cols',
+                        help="Competency score column; repeat for each. Defaults to the four standard competencies.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent requests.")
+    parser.add_argument('--rpm', type=int, default=DEFAULT_REQUESTS_PER_MINUTE, help="Requests per minute.")
+    parser.add_argument('--tpm', type=int, default=DEFAULT_TOKENS_PER_MINUTE, help="Tokens per minute.")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Candidates per request.")
+    parser.add_argument('--full-prompt', action='store_true', help="Send the full master prompt for every candidate.")
+    parser.add_argument('--no-cache', action='store_true', help="Sample a fresh summary for every candidate.")
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH, help="Summary cache location.")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows processed per checkpoint.")
+    parser.add_argument('--max-regenerations', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="Times to regenerate summaries that fail validation; 0 only flags them.")
+    parser.add_argument('--restart', action='store_true', help="Ignore any previous progress and start over.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    api_key = os.environ.get('GEMINI_API_KEY')
+    if not api_key:
+        print("GEMINI_API_KEY environment variable is not set.", file=sys.stderr)
+        return 2
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}_summaries.csv"
+    generation_engine = GenerationEngine(max_workers=args.workers, limiter=RateLimiter(args.rpm, args.tpm))
+    cache = None if args.no_cache else SummaryCache(args.cache_path)
+
+    def on_progress(rows_done, totals):
+        print(
+            f"{rows_done} rows done ({totals['api_calls']} API calls, {totals['cache_hits']} cache hits this run)",
+            file=sys.stderr, flush=True
+        )
+
+    try:
+        header = read_header(args.input)
+        competency_cols = args.competency_cols or [c for c in EXPECTED_COMPETENCIES if c in header]
+        totals = run_job(
+            args.input, output, GeminiBackend(api_key), generation_engine,
+            name_col=args.name_col, competency_cols=competency_cols, cache=cache,
+            batch_size=args.batch_size, compact_prompts=not args.full_prompt,
+            chunk_size=args.chunk_size, resume=not args.restart, on_progress=on_progress,
+            max_attempts=args.max_regenerations,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if totals['skipped_rows']:
+        print(f"Resumed after {totals['skipped_rows']} previously completed rows.", file=sys.stderr)
+    print(
+        f"{totals['invalid_rows']} summaries failed validation, {totals['regenerated']} rows regenerated, "
+        f"{totals['still_invalid']} still flagged in the '{VALIDATION_COLUMN}' column.",
+        file=sys.stderr
+    )
+    summary = totals['metrics']
+    print(
+        f"{summary['api_calls']} API calls, {summary['retries']} retries, "
+        f"{summary['prompt_tokens'] + summary['output_tokens']:,} tokens, est. ${summary['estimated_cost_usd']:.2f}; "
+        f"latency p50 {summary['latency_p50_s']}s / p95 {summary['latency_p95_s']}s",
+        file=sys.stderr
+    )
+    print(f"Wrote {output} and its .metrics.csv/.metrics.jsonl/.metrics.prom files", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Concurrent, rate-limited execution of Gemini summary requests."""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# --- Defaults ---
+# Conservative defaults for a single paid-tier key; override via secrets or the UI.
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = 1_000_000
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 60.0
+
+# Rough output budget for a ~400 word summary, used when reserving tokens up front.
+OUTPUT_TOKEN_ESTIMATE = 700
+
+RETRYABLE_ERROR_NAMES = {
+    'ResourceExhausted', 'TooManyRequests', 'InternalServerError',
+    'ServiceUnavailable', 'DeadlineExceeded', 'BadGateway', 'GatewayTimeout',
+}
+
+
+# --- Rate Limiting ---
+
+class TokenBucket:
+    """A thread-safe token bucket that refills continuously at `capacity` per minute."""
+
+    def __init__(self, capacity_per_minute):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1, cancel_event=None):
+        """
+        Blocks until `amount` tokens are available and returns the seconds spent waiting.
+
+        Raises `GenerationCancelled` without taking any tokens if `cancel_event` is set while waiting.
+        """
+        # A single request larger than the whole bucket could never be served; clamp it.
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                shortfall = (amount - self.tokens) / self.rate
+            if cancel_event is None:
+                time.sleep(shortfall)
+            elif cancel_event.wait(shortfall):
+                raise GenerationCancelled()
+            waited += shortfall
+
+
+class RateLimiter:
+    """Enforces both a requests-per-minute and a tokens-per-minute quota."""
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens=0, cancel_event=None):
+        """Reserves one request slot plus `tokens` tokens; returns the seconds spent waiting."""
+        waited = self.requests.acquire(1, cancel_event)
+        if tokens:
+            waited += self.tokens.acquire(tokens, cancel_event)
+        return waited
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used for quota reservations."""
+    return len(text) // 4 + 1
+
+
+# --- Retries ---
+
+def is_retryable(exc):
+    """Returns True for rate-limit (429) and server-side (5xx) failures."""
+    code = getattr(exc, 'code', None)
+    if not isinstance(code, int):
+        code = getattr(exc, 'status_code', None)
+    if isinstance(code, int):
+        return code == 429 or 500 <= code < 600
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Exponential backoff with full jitter for the given (zero-based) retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+# --- Engine ---
+
+class GenerationCancelled(Exception):
+    """Raised by `GenerationEngine.run` when its cancel event is set before all items are processed."""
+
+
+class RequestTiming:
+    """Where one item's time went: waiting for a worker and quota, then calling (including retries)."""
+
+    def __init__(self):
+        self.queue_wait = 0.0
+        self.latency = 0.0
+        self.retries = 0
+        self.error = None
+
+
+class GenerationEngine:
+    """
+    Runs request functions over a list of items on a thread pool, returning results in input order.
+
+    By default each run gets its own pool. Pass a shared `executor` to run several engines on one
+    process-wide pool; `max_workers` then caps how many of this engine's requests are in flight at once.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, limiter=None, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, executor=None, cancel_event=None):
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = executor
+        self.cancel_event = cancel_event
+
+    @property
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def call(self, request_fn, item, tokens=0, timing=None):
+        """
+        Calls `request_fn(item)` under the rate limiter, retrying retryable errors with backoff.
+
+        If a `RequestTiming` is given, the first quota wait, the call latency and the retry count are
+        recorded on it.
+        """
+        attempt = 0
+        started = None
+        try:
+            while True:
+                if self.cancelled:
+                    raise GenerationCancelled()
+                if self.limiter is not None:
+                    waited = self.limiter.acquire(tokens)
+                    if timing is not None and started is None:
+                        timing.queue_wait += waited or 0.0
+                    # The permit may have taken a while; don't spend it on a job that was cancelled meanwhile
+                    if self.cancelled:
+                        raise GenerationCancelled()
+                if started is None:
+                    started = time.monotonic()
+                try:
+                    return request_fn(item)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                    if self.cancel_event is not None:
+                        self.cancel_event.wait(delay)
+                    else:
+                        time.sleep(delay)
+                    attempt += 1
+        finally:
+            if timing is not None:
+                timing.retries = attempt
+                timing.latency = time.monotonic() - started if started is not None else 0.0
+
+    def run(self, items, request_fn, token_estimate=None, on_error=None, on_complete=None, on_timing=None):
+        """
+        Processes every item concurrently and returns the results in the same order as `items`.
+
+        `token_estimate(item)` sizes the token reservation for each request. If `on_error` is
+        given, a request that still fails after retries yields `on_error(exc)` instead of raising.
+        `on_complete(index, result, done, total)` is called from the calling thread as results arrive,
+        so it is safe to update Streamlit elements from it, as is `on_timing(index, RequestTiming)`.
+        Raises `GenerationCancelled` once in-flight requests finish if the cancel event is set.
+        """
+        items = list(items)
+        total = len(items)
+        results = [None] * total
+        if not total:
+            return results
+
+        timings = {}
+
+        def task(index, item, submitted):
+            timing = timings[index] = RequestTiming()
+            timing.queue_wait = time.monotonic() - submitted
+            tokens = token_estimate(item) if token_estimate else 0
+            try:
+                return self.call(request_fn, item, tokens, timing)
+            except GenerationCancelled:
+                raise
+            except Exception as e:
+                timing.error = str(e)
+                if on_error is None:
+                    raise
+                return on_error(e)
+
+        own_executor = self.executor is None
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, total)) if own_executor else self.executor
+        try:
+            # Keep at most max_workers requests submitted at a time, so a shared pool interleaves runs fairly
+            pending = iter(enumerate(items))
+            in_flight = {}
+            done = 0
+            while True:
+                while len(in_flight) < self.max_workers and not self.cancelled:
+                    next_item = next(pending, None)
+                    if next_item is None:
+                        break
+                    index, item = next_item
+                    in_flight[executor.submit(task, index, item, time.monotonic())] = index
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = in_flight.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except GenerationCancelled:
+                        continue
+                    done += 1
+                    if on_timing:
+                        on_timing(index, timings[index])
+                    if on_complete:
+                        on_complete(index, results[index], done, total)
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+        if done < total and self.cancelled:
+            raise GenerationCancelled()
+        return results
@@ -0,0 +1,278 @@
+"""
+Writes result rows to .xlsx, .parquet and .csv files on disk as they are produced.
+
+Downloads are read from these files, one format at a time and only when asked for. Streamlit's
+download_button cannot stream: it takes the whole file as bytes and keeps them in its media store.
+"""
+import csv
+import math
+import os
+import shutil
+import tempfile
+import threading
+
+# --- Formats ---
+XLSX, PARQUET, CSV = 'xlsx', 'parquet', 'csv'
+EXPORT_FORMATS = (XLSX, PARQUET, CSV)
+MIME_TYPES = {
+    XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    PARQUET: 'application/vnd.apache.parquet',
+    CSV: 'text/csv',
+}
+
+# --- Spreadsheet Layout ---
+# Column widths are in characters; text in wide columns wraps and its row grows to fit
+WIDE_COLUMN_WIDTH = 100
+DEFAULT_COLUMN_WIDTH = 18
+LINE_HEIGHT = 15
+MAX_ROW_HEIGHT = 409  # Excel's limit, in points
+
+# --- Parquet Layout ---
+# Rows may arrive a few at a time; they are buffered into row groups of this size
+ROW_GROUP_SIZE = 1000
+
+
+def _rows(chunk):
+    """Yields each row with missing values as None and numpy scalars as Python ones, for the file writers."""
+    import pandas as pd
+
+    for values in chunk.itertuples(index=False, name=None):
+        yield [None if pd.isna(value) else value.item() if hasattr(value, 'item') else value for value in values]
+
+
+def row_height(texts, width=WIDE_COLUMN_WIDTH):
+    """Estimates the height in points a row needs to show `texts` wrapped at `width` characters."""
+    lines = 1
+    for text in texts:
+        if isinstance(text, str) and text:
+            lines = max(lines, sum(max(1, math.ceil(len(line) / width)) for line in text.split('\n')))
+    return min(MAX_ROW_HEIGHT, lines * LINE_HEIGHT)
+
+
+class CsvExport:
+    """Appends rows to a UTF-8 CSV with a byte-order mark, so Excel detects the encoding."""
+
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, chunk):
+        self.writer.writerows(_rows(chunk))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxExport:
+    """
+    Streams rows into a workbook with XlsxWriter's constant_memory mode, which flushes each row to
+    disk as soon as the next one starts, so rows must arrive in order. Columns listed in
+    `wide_columns` are wrapped and their rows sized to fit.
+    """
+
+    def __init__(self, path, columns, wide_columns=()):
+        import xlsxwriter
+
+        # Cells hold user data, so text starting with '=' or looking like a URL must stay plain text
+        self.workbook = xlsxwriter.Workbook(
+            path, {'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False}
+        )
+        self.sheet = self.workbook.add_worksheet('Summaries')
+        header = self.workbook.add_format({'bold': True, 'text_wrap': True, 'valign': 'top', 'bottom': 1})
+        self.cell_format = self.workbook.add_format({'valign': 'top'})
+        self.wide_format = self.workbook.add_format({'text_wrap': True, 'valign': 'top'})
+        self.wide_positions = [i for i, col in enumerate(columns) if col in wide_columns]
+        for i, col in enumerate(columns):
+            if i in self.wide_positions:
+                self.sheet.set_column(i, i, WIDE_COLUMN_WIDTH, self.wide_format)
+            else:
+                self.sheet.set_column(i, i, max(DEFAULT_COLUMN_WIDTH, len(str(col)) + 2), self.cell_format)
+        self.sheet.write_row(0, 0, columns, header)
+        self.sheet.freeze_panes(1, 0)
+        self.next_row = 1
+
+    def write(self, chunk):
+        for values in _rows(chunk):
+            # In constant_memory mode the row height must be set before the row's cells are written
+            self.sheet.set_row(self.next_row, row_height([values[i] for i in self.wide_positions]))
+            for i, value in enumerate(values):
+                self.sheet.write(self.next_row, i, value, self.wide_format if i in self.wide_positions else self.cell_format)
+            self.next_row += 1
+
+    def close(self):
+        self.workbook.close()
+
+
+def _arrow_schema(table):
+    """
+    Widens a schema inferred from one chunk so later chunks fit it: text and columns that were
+    entirely empty in that chunk become plain strings.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for field in table.schema:
+        if pa.types.is_null(field.type) or pa.types.is_large_string(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class ParquetExport:
+    """
+    Buffers chunks into row groups of `ROW_GROUP_SIZE` rows of a Parquet file whose schema is taken
+    from the first row group, with text and entirely empty columns stored as strings.
+    """
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.writer = None
+        self.pending = []
+        self.pending_rows = 0
+
+    def write(self, chunk):
+        self.pending.append(chunk[self.columns])
+        self.pending_rows += len(chunk)
+        if self.pending_rows >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.pending:
+            return
+        tables = [pa.Table.from_pandas(chunk, preserve_index=False) for chunk in self.pending]
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, _arrow_schema(tables[0]))
+        self.writer.write_table(pa.concat_tables([table.cast(self.writer.schema) for table in tables]))
+        self.pending, self.pending_rows = [], 0
+
+    def close(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._flush()
+        if self.writer is None:
+            # Nothing was written; leave a valid empty file behind
+            pq.write_table(pa.table({col: pa.array([], pa.string()) for col in self.columns}), self.path)
+        else:
+            self.writer.close()
+
+
+def read_parquet_rows(path, start, stop):
+    """Reads rows [start, stop) of a Parquet file, decoding only the row groups that hold them."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    tables = []
+    offset = 0
+    for group in range(parquet_file.num_row_groups):
+        size = parquet_file.metadata.row_group(group).num_rows
+        if offset < stop and offset + size > start:
+            table = parquet_file.read_row_group(group)
+            tables.append(table.slice(max(0, start - offset), min(size, stop - offset) - max(0, start - offset)))
+        offset += size
+    if not tables:
+        return parquet_file.schema_arrow.empty_table().to_pandas()
+    return pa.concat_tables(tables).to_pandas().set_axis(range(start, start + sum(t.num_rows for t in tables)))
+
+
+class ResultExporter:
+    """
+    Writes result chunks to every export format at once, in a private temporary directory.
+
+    Chunks must be written in row order. Files are complete once `close` returns; `discard` removes them.
+    The CSV can also be read while chunks are still being written, for partial downloads.
+    """
+
+    def __init__(self, columns, base_name='Executive_Summaries_Output', wide_columns=(), formats=EXPORT_FORMATS,
+                 directory=None):
+        self.columns = list(columns)
+        self.base_name = base_name
+        self.wide_columns = wide_columns
+        self.directory = directory or tempfile.mkdtemp(prefix='executive-summaries-')
+        self.paths = {fmt: os.path.join(self.directory, f"{base_name}.{fmt}") for fmt in formats}
+        self.rows = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.writers = []
+        for fmt, path in self.paths.items():
+            if fmt == XLSX:
+                self.writers.append(XlsxExport(path, self.columns, wide_columns))
+            elif fmt == PARQUET:
+                self.writers.append(ParquetExport(path, self.columns))
+            else:
+                self.writers.append(CsvExport(path, self.columns))
+
+    def write(self, chunk):
+        chunk = chunk[self.columns]
+        with self.lock:
+            for writer in self.writers:
+                writer.write(chunk)
+            self.rows += len(chunk)
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            for writer in self.writers:
+                writer.close()
+
+    def replace_rows(self, updates):
+        """
+        Closes the export and rewrites it with `updates` ({row position: {column: value}}) applied.
+
+        The files are append-only, so they are rebuilt from the Parquet export one row group at a time
+        in a staging directory and then swapped in; the previous files stay readable until then. Needs the
+        Parquet export.
+        """
+        import pyarrow.parquet as pq
+
+        self.close()
+        if not updates:
+            return
+        staging = ResultExporter(
+            self.columns, self.base_name, self.wide_columns, list(self.paths),
+            directory=tempfile.mkdtemp(dir=self.directory),
+        )
+        parquet_file = pq.ParquetFile(self.paths[PARQUET])
+        start = 0
+        for group in range(parquet_file.num_row_groups):
+            chunk = parquet_file.read_row_group(group).to_pandas()
+            chunk.index = range(start, start + len(chunk))
+            for position in [p for p in updates if start <= p < start + len(chunk)]:
+                for col, value in updates[position].items():
+                    chunk.at[position, col] = value
+            staging.write(chunk)
+            start += len(chunk)
+        staging.close()
+        with self.lock:
+            for fmt, path in staging.paths.items():
+                os.replace(path, self.paths[fmt])
+        shutil.rmtree(staging.directory, ignore_errors=True)
+
+    def reader(self, fmt):
+        """
+        Returns a callable that reads one export from disk, for a deferred download.
+
+        The file is read whole, as download_button needs bytes; it runs only when its button is clicked.
+        """
+        def read():
+            # Hold off writers, so a partial read never ends mid-chunk
+            with self.lock, open(self.paths[fmt], 'rb') as f:
+                return f.read()
+        return read
+
+    def read_rows(self, start, stop):
+        """Reads a page of the finished results back from the Parquet export."""
+        return read_parquet_rows(self.paths[PARQUET], start, stop)
+
+    def discard(self):
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
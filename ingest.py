@@ -0,0 +1,75 @@
+"""Parses uploaded candidate files into compact DataFrames holding only the columns a run needs."""
+import hashlib
+import io
+import os
+
+# --- Formats ---
+SUPPORTED_EXTENSIONS = ('.xlsx', '.csv', '.parquet')
+UPLOAD_TYPES = [extension.lstrip('.') for extension in SUPPORTED_EXTENSIONS]
+
+
+def content_hash(data):
+    """Identifies an upload by its bytes, so re-uploads and reruns of the same file share one parse."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _extension(file_name):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported file type '{extension}'. Expected one of: {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
+    return extension
+
+
+def read_columns(data, file_name):
+    """Returns the column names of an uploaded file without parsing its data rows."""
+    import pandas as pd
+
+    extension = _extension(file_name)
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+
+        return list(pq.ParquetFile(io.BytesIO(data)).schema_arrow.names)
+    if extension == '.csv':
+        return pd.read_csv(io.BytesIO(data), nrows=0, encoding='utf-8-sig').columns.tolist()
+    return pd.read_excel(io.BytesIO(data), nrows=0).columns.tolist()
+
+
+def compact_scores(series):
+    """
+    Stores a score column in the smallest type that keeps its values: nullable Int8 for whole
+    numbers, float32 for other numbers and categorical labels when it holds non-numeric text.
+    """
+    import pandas as pd
+
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.isna().sum() > series.isna().sum():
+        return series.astype('category')
+    values = numeric.dropna()
+    if ((values % 1) == 0).all() and values.between(-128, 127).all():
+        return numeric.astype('Int8')
+    return numeric.astype('float32')
+
+
+def load_table(data, file_name, name_col, competency_cols):
+    """
+    Parses only the name and competency columns of an uploaded file, with compact score columns.
+
+    Rows with no values at all are dropped and the index is reset, so row numbers are positions.
+    """
+    import pandas as pd
+
+    columns = list(dict.fromkeys([name_col] + list(competency_cols)))
+    extension = _extension(file_name)
+    if extension == '.parquet':
+        df = pd.read_parquet(io.BytesIO(data), columns=columns)
+    elif extension == '.csv':
+        df = pd.read_csv(io.BytesIO(data), usecols=columns, encoding='utf-8-sig')
+    else:
+        df = pd.read_excel(io.BytesIO(data), usecols=columns)
+
+    df = df[columns].dropna(how='all').reset_index(drop=True)
+    for col in competency_cols:
+        df[col] = compact_scores(df[col])
+    return df
@@ -0,0 +1,238 @@
+"""Background generation jobs sharing one worker pool and one API quota across all sessions."""
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from engine import (
+    GenerationEngine, GenerationCancelled, RateLimiter,
+    DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+)
+
+# --- Defaults ---
+DEFAULT_MAX_JOBS = 4
+# Finished jobs are kept this long so their owners can still collect the results
+JOB_RETENTION_SECONDS = 6 * 60 * 60
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+# --- Scheduler ---
+
+class FairScheduler:
+    """
+    Hands out the API key's rate-limit permits fairly across sessions, then across each session's jobs.
+
+    Waiting requests are served round-robin: one permit per session in turn, and within a session one
+    permit per job in turn, so a large upload cannot starve a small one sharing the same key.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.condition = threading.Condition()
+        # owner -> OrderedDict(job_id -> deque of waiting tickets); dict order is the round-robin order
+        self.waiting = OrderedDict()
+        self.granting = None
+
+    def _next_ticket(self):
+        for jobs in self.waiting.values():
+            for tickets in jobs.values():
+                return tickets[0]
+        return None
+
+    def _discard(self, owner, job_id, ticket=None):
+        """Removes one waiting ticket, or all of a job's tickets when `ticket` is None."""
+        jobs = self.waiting.get(owner)
+        tickets = jobs.get(job_id) if jobs else None
+        if tickets is None:
+            return
+        if ticket is None:
+            tickets.clear()
+        elif ticket in tickets:
+            tickets.remove(ticket)
+        if not tickets:
+            del jobs[job_id]
+        if not jobs:
+            del self.waiting[owner]
+
+    def acquire(self, owner, job_id, tokens=0, cancel_event=None):
+        """
+        Blocks until it is this job's turn and the shared quota allows the request; returns the wait in seconds.
+
+        Raises `GenerationCancelled` as soon as `cancel_event` is set, without taking a permit.
+        """
+        started = time.monotonic()
+        ticket = object()
+        with self.condition:
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled()
+            self.waiting.setdefault(owner, OrderedDict()).setdefault(job_id, deque()).append(ticket)
+            while self.granting is not None or self._next_ticket() is not ticket:
+                if cancel_event is not None and cancel_event.is_set():
+                    self._discard(owner, job_id, ticket)
+                    self.condition.notify_all()
+                    raise GenerationCancelled()
+                self.condition.wait()
+            self.granting = ticket
+            jobs = self.waiting.pop(owner)
+            tickets = jobs.pop(job_id)
+            tickets.popleft()
+            # Move the served job and owner to the back of the line
+            if tickets:
+                jobs[job_id] = tickets
+            if jobs:
+                self.waiting[owner] = jobs
+        try:
+            self.limiter.acquire(tokens, cancel_event)
+        finally:
+            with self.condition:
+                self.granting = None
+                self.condition.notify_all()
+        return time.monotonic() - started
+
+    def cancel(self, owner, job_id):
+        """Drops a cancelled job's waiting tickets and wakes its requests, so they give up instead of taking quota."""
+        with self.condition:
+            self._discard(owner, job_id)
+            self.condition.notify_all()
+
+    def limiter_for(self, owner, job_id, cancel_event=None):
+        """Returns a limiter that a `GenerationEngine` can use to draw permits on behalf of one job."""
+        return JobLimiter(self, owner, job_id, cancel_event)
+
+
+class JobLimiter:
+    """The per-job view of a `FairScheduler`, with the same `acquire` interface as `RateLimiter`."""
+
+    def __init__(self, scheduler, owner, job_id, cancel_event=None):
+        self.scheduler = scheduler
+        self.owner = owner
+        self.job_id = job_id
+        self.cancel_event = cancel_event
+
+    def acquire(self, tokens=0):
+        return self.scheduler.acquire(self.owner, self.job_id, tokens, self.cancel_event)
+
+
+# --- Jobs ---
+
+class Job:
+    """A background generation job whose progress can be polled from any script run."""
+
+    def __init__(self, owner, label='', source=None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.label = label
+        # What the job was started from, so a view can check that its results still match
+        self.source = source
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        # row -> (text so far, final), filled in while the job streams its results
+        self.outputs = {}
+        # Callables that release the job's files once it is pruned
+        self.cleanup = []
+        # The export the job writes as it goes, so saved rows can be downloaded before it finishes
+        self.exporter = None
+        # Callables that withdraw the job's waiting requests when it is cancelled
+        self.on_cancel = []
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 0.0
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def update_progress(self, done, total):
+        self.done, self.total = done, total
+
+    def update_outputs(self, rows, text, final):
+        for row in rows:
+            # A late partial never overwrites a finished text
+            if final or not self.outputs.get(row, ('', False))[1]:
+                self.outputs[row] = (text, final)
+
+    def cancel(self):
+        self.cancel_event.set()
+        for withdraw in self.on_cancel:
+            withdraw()
+
+    def discard(self):
+        for release in self.cleanup:
+            release()
+
+
+class JobManager:
+    """Runs jobs on a small job pool while all of their API requests share one request pool and scheduler."""
+
+    def __init__(self, scheduler=None, max_workers=DEFAULT_MAX_WORKERS, max_jobs=DEFAULT_MAX_JOBS):
+        self.scheduler = scheduler or FairScheduler()
+        self.max_workers = max_workers
+        self.request_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gemini-request')
+        self.job_pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='summary-job')
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, target, owner, label='', max_workers=None, source=None):
+        """
+        Queues `target(job, engine)` to run in the background and returns the `Job`.
+
+        The engine draws permits from the shared scheduler and runs requests on the shared pool.
+        Whatever `target` returns becomes `job.result`; `source` is kept on the job as is.
+        """
+        self._prune()
+        job = Job(owner, label, source)
+        engine = GenerationEngine(
+            max_workers=min(max_workers or self.max_workers, self.max_workers),
+            limiter=self.scheduler.limiter_for(owner, job.id, job.cancel_event),
+            executor=self.request_pool,
+            cancel_event=job.cancel_event,
+        )
+        job.on_cancel.append(lambda: self.scheduler.cancel(owner, job.id))
+        with self.lock:
+            self.jobs[job.id] = job
+        self.job_pool.submit(self._run, job, target, engine)
+        return job
+
+    def _run(self, job, target, engine):
+        if job.cancel_event.is_set():
+            job.status, job.finished_at = CANCELLED, time.time()
+            return
+        job.status = RUNNING
+        try:
+            job.result = target(job, engine)
+            job.status = DONE
+        except GenerationCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = f"{e}\n\n{traceback.format_exc()}"
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def active_jobs(self):
+        with self.lock:
+            return [job for job in self.jobs.values() if not job.finished]
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self.lock:
+            expired = [j for j in self.jobs.values() if j.finished_at is not None and j.finished_at < cutoff]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            job.discard()
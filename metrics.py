@@ -0,0 +1,213 @@
+"""Per-request and per-row instrumentation of a generation run: latency, retries, token usage and cost."""
+import json
+import threading
+import time
+
+# --- Pricing ---
+# USD per million tokens as (input, output). Unknown models, including the simulator, are priced like the default.
+PRICING = {
+    'gemini-2.5-pro': (1.25, 10.00),
+    'gemini-2.5-flash': (0.30, 2.50),
+}
+DEFAULT_PRICING = PRICING['gemini-2.5-pro']
+
+LATENCY_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+ROW_COLUMNS = [
+    'Row', 'Candidate', 'Source', 'Latency (s)', 'Queue Wait (s)', 'Retries',
+    'Prompt Tokens', 'Output Tokens', 'Estimated Cost (USD)',
+]
+
+
+def estimate_cost(model_name, prompt_tokens, output_tokens):
+    input_price, output_price = PRICING.get(model_name, DEFAULT_PRICING)
+    return (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers; 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class RequestRecord:
+    """One API request: how long it waited and took, how often it was retried and what it cost."""
+
+    def __init__(self, kind, candidates, timing, prompt_tokens=0, output_tokens=0, cost=0.0):
+        self.kind = kind
+        self.candidates = candidates
+        self.queue_wait = timing.queue_wait
+        self.latency = timing.latency
+        self.retries = timing.retries
+        self.error = timing.error
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        self.cost = cost
+        self.finished_at = time.time()
+
+    def to_dict(self):
+        return {
+            'type': 'request', 'kind': self.kind, 'candidates': self.candidates,
+            'queue_wait_s': round(self.queue_wait, 4), 'latency_s': round(self.latency, 4),
+            'retries': self.retries, 'error': self.error,
+            'prompt_tokens': self.prompt_tokens, 'output_tokens': self.output_tokens,
+            'cost_usd': round(self.cost, 6), 'finished_at': self.finished_at,
+        }
+
+
+class RunMetrics:
+    """
+    Collects request records and per-row metrics for one run and summarizes them.
+
+    The summary is built from running totals and the list of request latencies, so callers that stream
+    records to disk, such as the batch pipeline, can drain them with `pop_requests` and `pop_rows`
+    without losing the totals.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.started_at = time.time()
+        self.finished_at = None
+        self.requests = []
+        self.rows = []
+        # Regenerated rows are recorded once per attempt but counted once
+        self.row_ids = set()
+        self.latencies = []
+        self.totals = {'failed_calls': 0, 'retries': 0, 'prompt_tokens': 0, 'output_tokens': 0, 'cost': 0.0,
+                       'queue_wait': 0.0}
+        self.lock = threading.Lock()
+
+    def record_request(self, kind, candidates, timing, prompt_tokens=0, output_tokens=0):
+        record = RequestRecord(
+            kind, candidates, timing, prompt_tokens, output_tokens,
+            estimate_cost(self.model_name, prompt_tokens, output_tokens),
+        )
+        with self.lock:
+            self.requests.append(record)
+            self.latencies.append(record.latency)
+            self.totals['failed_calls'] += 1 if record.error else 0
+            self.totals['retries'] += record.retries
+            self.totals['prompt_tokens'] += prompt_tokens
+            self.totals['output_tokens'] += output_tokens
+            self.totals['cost'] += record.cost
+            self.totals['queue_wait'] += record.queue_wait
+        return record
+
+    def record_row(self, row, candidate, source, record=None, share=1.0):
+        """Records one output row; `share` is the fraction of `record`'s tokens and cost charged to this row."""
+        entry = {
+            'Row': row,
+            'Candidate': candidate,
+            'Source': source,
+            'Latency (s)': round(record.latency, 3) if record else 0.0,
+            'Queue Wait (s)': round(record.queue_wait, 3) if record else 0.0,
+            'Retries': record.retries if record else 0,
+            'Prompt Tokens': round(record.prompt_tokens * share) if record else 0,
+            'Output Tokens': round(record.output_tokens * share) if record else 0,
+            'Estimated Cost (USD)': round(record.cost * share, 6) if record else 0.0,
+        }
+        with self.lock:
+            self.rows.append(entry)
+            self.row_ids.add(row)
+
+    def pop_rows(self):
+        with self.lock:
+            rows, self.rows = self.rows, []
+        return rows
+
+    def pop_requests(self):
+        with self.lock:
+            requests, self.requests = self.requests, []
+        return requests
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    # --- Reporting ---
+
+    def summary(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            totals = dict(self.totals)
+        wall = (self.finished_at or time.time()) - self.started_at
+        return {
+            'model': self.model_name,
+            'rows': len(self.row_ids),
+            'api_calls': len(latencies),
+            'failed_calls': totals['failed_calls'],
+            'retries': totals['retries'],
+            'prompt_tokens': totals['prompt_tokens'],
+            'output_tokens': totals['output_tokens'],
+            'estimated_cost_usd': round(totals['cost'], 4),
+            'wall_time_s': round(wall, 2),
+            'latency_p50_s': round(percentile(latencies, 50), 3),
+            'latency_p95_s': round(percentile(latencies, 95), 3),
+            'latency_p99_s': round(percentile(latencies, 99), 3),
+            'queue_wait_mean_s': round(totals['queue_wait'] / len(latencies), 3) if latencies else 0.0,
+        }
+
+    def rows_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.rows, columns=ROW_COLUMNS)
+
+    def latency_histogram(self, bins=20):
+        """Returns request counts per latency bin, indexed by the bin's upper edge in seconds."""
+        import pandas as pd
+
+        latencies = pd.Series(self.latencies, dtype=float)
+        if latencies.empty:
+            return pd.DataFrame({'Requests': []})
+        counts = pd.cut(latencies, bins=min(bins, max(1, latencies.nunique()))).value_counts(sort=False)
+        return pd.DataFrame({'Requests': counts.values}, index=[f"{interval.right:.1f}s" for interval in counts.index])
+
+    def slowest_rows(self, n=10):
+        frame = self.rows_frame()
+        return frame[frame['Source'] != 'cache'].nlargest(n, 'Latency (s)')
+
+    def to_jsonl(self, include_summary=True):
+        """One JSON object per request still held, followed by the run summary."""
+        lines = [json.dumps(r.to_dict()) for r in self.requests]
+        if include_summary:
+            lines.append(json.dumps({'type': 'summary', **self.summary()}))
+        return ''.join(line + '\n' for line in lines)
+
+    def to_prometheus(self):
+        """Renders the run totals and the request latency histogram in Prometheus text exposition format."""
+        summary = self.summary()
+        label = f'model="{self.model_name}"'
+        lines = [
+            '# HELP summary_rows_total Rows with a generated executive summary.',
+            '# TYPE summary_rows_total counter',
+            f'summary_rows_total{{{label}}} {summary["rows"]}',
+            '# HELP summary_api_calls_total Requests sent to the model API.',
+            '# TYPE summary_api_calls_total counter',
+            f'summary_api_calls_total{{{label}}} {summary["api_calls"]}',
+            '# HELP summary_api_calls_failed_total Requests that still failed after retries.',
+            '# TYPE summary_api_calls_failed_total counter',
+            f'summary_api_calls_failed_total{{{label}}} {summary["failed_calls"]}',
+            '# HELP summary_retries_total Retried requests after 429 or 5xx responses.',
+            '# TYPE summary_retries_total counter',
+            f'summary_retries_total{{{label}}} {summary["retries"]}',
+            '# HELP summary_tokens_total Tokens reported by the API usage metadata.',
+            '# TYPE summary_tokens_total counter',
+            f'summary_tokens_total{{{label},type="prompt"}} {summary["prompt_tokens"]}',
+            f'summary_tokens_total{{{label},type="output"}} {summary["output_tokens"]}',
+            '# HELP summary_estimated_cost_usd_total Estimated spend from token usage and list prices.',
+            '# TYPE summary_estimated_cost_usd_total counter',
+            f'summary_estimated_cost_usd_total{{{label}}} {summary["estimated_cost_usd"]}',
+            '# HELP summary_request_latency_seconds Wall latency of API requests, including retries.',
+            '# TYPE summary_request_latency_seconds histogram',
+        ]
+        latencies = self.latencies
+        for bucket in LATENCY_BUCKETS:
+            count = sum(1 for latency in latencies if latency <= bucket)
+            lines.append(f'summary_request_latency_seconds_bucket{{{label},le="{bucket}"}} {count}')
+        lines += [
+            f'summary_request_latency_seconds_bucket{{{label},le="+Inf"}} {len(latencies)}',
+            f'summary_request_latency_seconds_sum{{{label}}} {round(sum(latencies), 4)}',
+            f'summary_request_latency_seconds_count{{{label}}} {len(latencies)}',
+        ]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,235 @@
+"""Streaming, resumable batch pipeline for large candidate workbooks."""
+import csv
+import json
+import os
+import zipfile
+
+from metrics import RunMetrics, ROW_COLUMNS
+from summarizer import generate_summaries
+from validator import regenerate_invalid, format_issues, DEFAULT_MAX_ATTEMPTS, VALIDATION_COLUMN
+
+# --- Defaults ---
+DEFAULT_CHUNK_SIZE = 200
+SUMMARY_COLUMN = 'Executive Summary'
+
+
+# --- Streaming Readers ---
+
+def _iter_xlsx(path):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # read_only mode streams rows from the sheet XML instead of building the whole workbook
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        # Corrupt files fail like the other readers' malformed input, rather than with zip internals
+        raise ValueError(f"{path} is not a readable .xlsx workbook: {e}") from e
+    try:
+        for values in workbook.active.iter_rows(values_only=True):
+            yield list(values)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from csv.reader(f)
+
+
+def _iter_parquet(path):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    yield list(parquet_file.schema_arrow.names)
+    # Decode one record batch at a time rather than the whole table
+    for batch in parquet_file.iter_batches():
+        yield from map(list, zip(*(column.to_pylist() for column in batch.columns)))
+
+
+READERS = {
+    '.xlsx': _iter_xlsx,
+    '.csv': _iter_csv,
+    '.parquet': _iter_parquet,
+}
+
+
+def iter_rows(path):
+    """Yields the header followed by every non-empty data row of an .xlsx, .csv or .parquet file, one row at a time."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported input file type '{extension}'. Expected one of: {', '.join(READERS)}")
+    for values in READERS[extension](path):
+        if any(value not in (None, '') for value in values):
+            yield values
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, skip_rows=0):
+    """Yields (header, DataFrame) pairs of at most `chunk_size` data rows, skipping the first `skip_rows`."""
+    import pandas as pd
+
+    rows = iter_rows(path)
+    header = [str(col).strip() if col is not None else '' for col in next(rows, [])]
+    chunk = []
+    start = skip_rows
+    for i, values in enumerate(rows):
+        if i < skip_rows:
+            continue
+        values = list(values[:len(header)]) + [None] * (len(header) - len(values))
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            # Index each chunk by its position in the whole file so row numbers stay meaningful
+            yield header, pd.DataFrame(chunk, columns=header, index=range(start, start + len(chunk)))
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield header, pd.DataFrame(chunk, columns=header, index=range(start, start + len(chunk)))
+
+
+def read_header(path):
+    """Returns the column names of an input file without reading its data rows."""
+    return [str(col).strip() if col is not None else '' for col in next(iter_rows(path), [])]
+
+
+# --- Journal ---
+
+def journal_path_for(output_path):
+    return f"{output_path}.journal"
+
+
+def metrics_paths_for(output_path):
+    """Per-row metrics CSV, per-request JSON lines and Prometheus text files written next to the output."""
+    return f"{output_path}.metrics.csv", f"{output_path}.metrics.jsonl", f"{output_path}.metrics.prom"
+
+
+def job_fingerprint(input_path, name_col, competency_cols, model_name, batch_size, compact_prompts, max_attempts):
+    """Identifies the input file version and the settings a job's output was produced with."""
+    stat = os.stat(input_path)
+    return {
+        'input': os.path.abspath(input_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+        'name_col': name_col, 'competency_cols': list(competency_cols), 'model': model_name,
+        'batch_size': batch_size, 'compact_prompts': compact_prompts, 'max_attempts': max_attempts,
+    }
+
+
+def read_journal(path):
+    """
+    Returns (rows_done, output_offset, fingerprint) from the journal's fingerprint line and last complete
+    entry, or (0, 0, None) for a fresh job.
+    """
+    rows_done, offset, fingerprint = 0, 0, None
+    if not os.path.exists(path):
+        return rows_done, offset, fingerprint
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn final line from a killed process; the previous entry still stands
+                break
+            if 'fingerprint' in entry:
+                fingerprint = entry['fingerprint']
+            else:
+                rows_done, offset = entry['rows_done'], entry['offset']
+    return rows_done, offset, fingerprint
+
+
+# --- Job ---
+
+def run_job(input_path, output_path, backend, generation_engine, name_col='Candidate Name', competency_cols=None,
+            cache=None, batch_size=1, compact_prompts=False, chunk_size=DEFAULT_CHUNK_SIZE, resume=True,
+            on_progress=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Generates summaries for every row of `input_path` and appends them to the CSV at `output_path`.
+
+    Rows are streamed in chunks, so memory stays flat regardless of input size. After each chunk the
+    output is flushed and a journal entry records how many rows are done and how long the output is,
+    so an interrupted job resumes where it stopped when run again with `resume=True`. The journal also
+    records the input file's size and modification time and the job's settings; resuming with a changed
+    file or different settings raises ValueError rather than mixing outputs.
+    Summaries that fail validation are regenerated up to `max_attempts` times before their chunk is
+    written, and any remaining violations are written to their own column.
+    Per-row and per-request metrics are appended next to the output after each chunk's journal entry,
+    and the run summary is written as the last JSON line and as a Prometheus text file.
+    `on_progress(rows_done, stats)` is called after every chunk. Returns the totals for this run.
+    """
+    journal_path = journal_path_for(output_path)
+    rows_done, offset, journaled = read_journal(journal_path) if resume else (0, 0, None)
+
+    header = read_header(input_path)
+    if name_col not in header:
+        raise ValueError(f"Name column '{name_col}' not found in {input_path}.")
+    competency_cols = competency_cols or []
+    missing = [col for col in competency_cols if col not in header]
+    if missing or not competency_cols:
+        raise ValueError(f"Competency columns not found in {input_path}: {', '.join(missing) or '(none selected)'}")
+
+    # Normalized the way it is stored, so it compares equal to a journaled copy
+    fingerprint = json.loads(json.dumps(job_fingerprint(
+        input_path, name_col, competency_cols, backend.model_name, batch_size, compact_prompts, max_attempts
+    )))
+    if offset and os.path.exists(output_path):
+        if journaled != fingerprint:
+            raise ValueError(
+                f"{output_path} was started from a different version of {input_path} or with different "
+                "settings; restart the job to regenerate it."
+            )
+        # Drop anything written after the last journaled chunk, then continue appending from there
+        os.truncate(output_path, offset)
+    else:
+        rows_done, offset = 0, 0
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    totals = {
+        'rows': 0, 'unique_profiles': 0, 'cache_hits': 0, 'api_calls': 0,
+        'invalid_rows': 0, 'regenerated': 0, 'still_invalid': 0, 'skipped_rows': rows_done,
+    }
+    metrics = RunMetrics(backend.model_name)
+    rows_metrics_path, requests_metrics_path, prometheus_path = metrics_paths_for(output_path)
+    metrics_mode = 'a' if offset else 'w'
+
+    with open(output_path, 'a', newline='', encoding='utf-8-sig') as out, \
+            open(journal_path, metrics_mode, encoding='utf-8') as journal, \
+            open(rows_metrics_path, metrics_mode, newline='', encoding='utf-8') as rows_metrics, \
+            open(requests_metrics_path, metrics_mode, encoding='utf-8') as requests_metrics:
+        writer = csv.writer(out)
+        rows_writer = csv.DictWriter(rows_metrics, fieldnames=ROW_COLUMNS)
+        if offset == 0:
+            journal.write(json.dumps({'fingerprint': fingerprint}) + '\n')
+            writer.writerow(header + [SUMMARY_COLUMN, VALIDATION_COLUMN])
+            rows_writer.writeheader()
+
+        for _, chunk in iter_chunks(input_path, chunk_size, skip_rows=rows_done):
+            summaries, stats = generate_summaries(
+                backend, chunk, name_col, competency_cols, generation_engine,
+                cache=cache, batch_size=batch_size, compact_prompts=compact_prompts, metrics=metrics,
+            )
+            summaries, violations, validation_stats = regenerate_invalid(
+                backend, chunk, name_col, competency_cols, generation_engine, summaries,
+                cache=cache, max_attempts=max_attempts, compact_prompts=compact_prompts, metrics=metrics,
+            )
+            chunk[SUMMARY_COLUMN] = summaries
+            chunk[VALIDATION_COLUMN] = [format_issues(issues) for issues in violations]
+            writer.writerows(chunk.itertuples(index=False, name=None))
+            out.flush()
+            os.fsync(out.fileno())
+
+            rows_done += len(chunk)
+            for key in ('rows', 'unique_profiles', 'cache_hits', 'api_calls'):
+                totals[key] += stats[key]
+            for key in ('invalid_rows', 'regenerated', 'still_invalid'):
+                totals[key] += validation_stats[key]
+            journal.write(json.dumps({'rows_done': rows_done, 'offset': os.fstat(out.fileno()).st_size}) + '\n')
+            journal.flush()
+            # Metrics follow the journal entry, so a chunk that is redone on resume is never counted twice
+            rows_writer.writerows(metrics.pop_rows())
+            requests_metrics.writelines(json.dumps(r.to_dict()) + '\n' for r in metrics.pop_requests())
+            if on_progress:
+                on_progress(rows_done, totals)
+
+        metrics.finish()
+        totals['metrics'] = metrics.summary()
+        requests_metrics.write(json.dumps({'type': 'summary', **totals['metrics']}) + '\n')
+    with open(prometheus_path, 'w', encoding='utf-8') as f:
+        f.write(metrics.to_prometheus())
+    return totals
@@ -0,0 +1,154 @@
+"""Compiles MASTER_PROMPT down to the rules and example that apply to a candidate's score profile."""
+import re
+from functools import lru_cache
+
+from engine import estimate_tokens
+
+# --- Profile Cases ---
+# Each special case maps to the rule that governs it and the gold example that illustrates it.
+ALL_DEVELOPMENT = 'all_development'  # no score above 2
+ALL_POTENTIAL = 'all_potential'      # every score is 3
+ALL_STRENGTHS = 'all_strengths'      # no score below 4
+MIXED = 'mixed'
+
+PROFILE_CASES = (ALL_DEVELOPMENT, ALL_POTENTIAL, ALL_STRENGTHS, MIXED)
+
+SPECIAL_CASE_RULES = {
+    ALL_DEVELOPMENT: 'If no competency scores are above 2',
+    ALL_POTENTIAL: 'If all competency scores are 3',
+    ALL_STRENGTHS: 'If no competency scores are below 4',
+}
+CASE_EXAMPLES = {
+    ALL_DEVELOPMENT: 1,
+    MIXED: 2,
+    ALL_STRENGTHS: 3,
+    ALL_POTENTIAL: 4,
+}
+
+SECTION_HEADINGS = (
+    'ROLE', 'CONTEXT', 'TASK', 'CORE COMPETENCIES', 'RULES OF INTERPRETATION & CONTENT', 'TONE AND STYLE',
+    'THINGS TO REMEMBER', 'SPECIAL CASES (CRITICAL)', 'INPUT FORMAT', 'OUTPUT FORMAT', 'GOLD STANDARD EXAMPLES',
+)
+SECTION_PATTERN = re.compile(
+    r'^(' + '|'.join(re.escape(h) for h in SECTION_HEADINGS) + r')(?!\w).*$', re.MULTILINE
+)
+EXAMPLE_PATTERN = re.compile(r'^Example (\d+):', re.MULTILINE)
+PARAGRAPH_1_PATTERN = re.compile(r'^Paragraph 1:.*?(?=^Paragraph 2:)', re.MULTILINE | re.DOTALL)
+
+
+# --- Classification ---
+
+def classify_profiles(df, competency_cols):
+    """
+    Classifies every row by score profile using vectorized comparisons.
+
+    Returns a DataFrame indexed like `df` with a `profile_case` column and `strengths`,
+    `potential_strengths` and `development_areas` columns holding comma-separated competency names.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Plain floats, so compact nullable and categorical score columns compare like any other
+    scores = df[competency_cols].apply(pd.to_numeric, errors='coerce').astype('float64')
+    strengths = scores >= 4
+    potential = scores == 3
+    development = scores <= 2
+
+    cases = np.select(
+        [development.all(axis=1), potential.all(axis=1), strengths.all(axis=1)],
+        [ALL_DEVELOPMENT, ALL_POTENTIAL, ALL_STRENGTHS],
+        default=MIXED,
+    )
+    labels = pd.Series([f"{col}, " for col in competency_cols], index=competency_cols, dtype=object)
+
+    def names(mask):
+        # Multiplying a boolean by a string keeps or blanks it; the row sum concatenates the survivors
+        return mask.mul(labels, axis=1).sum(axis=1).str.rstrip(', ')
+
+    return pd.DataFrame({
+        'profile_case': cases,
+        'strengths': names(strengths),
+        'potential_strengths': names(potential),
+        'development_areas': names(development),
+    }, index=df.index)
+
+
+def classify_scores(scores):
+    """Classifies a single sequence of scores; the scalar counterpart of `classify_profiles`."""
+    scores = [float(s) for s in scores]
+    if all(s <= 2 for s in scores):
+        return ALL_DEVELOPMENT
+    if all(s == 3 for s in scores):
+        return ALL_POTENTIAL
+    if all(s >= 4 for s in scores):
+        return ALL_STRENGTHS
+    return MIXED
+
+
+# --- Compilation ---
+
+def split_sections(master_prompt):
+    """Splits the master prompt into an ordered {heading: text} dict, each text including its heading."""
+    matches = list(SECTION_PATTERN.finditer(master_prompt))
+    sections = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(master_prompt)
+        sections[match.group(1)] = master_prompt[match.start():end].strip()
+    return sections
+
+
+def _examples(section):
+    """Returns {example number: text} from the gold standard examples section."""
+    matches = list(EXAMPLE_PATTERN.finditer(section))
+    examples = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(section)
+        examples[int(match.group(1))] = section[match.start():end].strip()
+    return examples
+
+
+@lru_cache(maxsize=None)
+def compile_prompt(master_prompt, profile_case):
+    """Builds the minimal prompt for one profile case: the shared rules, its special case and its closest example."""
+    sections = split_sections(master_prompt)
+    parts = []
+    for heading, text in sections.items():
+        if heading == 'RULES OF INTERPRETATION & CONTENT' and profile_case == ALL_DEVELOPMENT:
+            # Only the developmental paragraph is written when there are no strengths to report
+            text = PARAGRAPH_1_PATTERN.sub('', text)
+        elif heading == 'SPECIAL CASES (CRITICAL)':
+            rule = SPECIAL_CASE_RULES.get(profile_case)
+            if rule is None:
+                continue
+            body = text.split('\n', 1)[1]
+            applicable = [p.strip() for p in body.split('\n\n') if p.strip().startswith(rule)]
+            text = f"SPECIAL CASE (CRITICAL)\n{applicable[0]}" if applicable else text
+        elif heading == 'GOLD STANDARD EXAMPLES':
+            example = _examples(text).get(CASE_EXAMPLES[profile_case])
+            if example is None:
+                continue
+            text = f"GOLD STANDARD EXAMPLE\n{example}"
+        parts.append(text)
+    return "\n\n".join(parts) + "\n"
+
+
+def compiled_variants(master_prompt):
+    """Returns {profile case: compiled prompt} for every case."""
+    return {case: compile_prompt(master_prompt, case) for case in PROFILE_CASES}
+
+
+def variant_report(master_prompt):
+    """Estimates the input-token saving of every compiled variant relative to the full master prompt."""
+    import pandas as pd
+
+    full_tokens = estimate_tokens(master_prompt)
+    rows = []
+    for case, prompt in compiled_variants(master_prompt).items():
+        tokens = estimate_tokens(prompt)
+        rows.append({
+            'Profile Case': case,
+            'Full Prompt Tokens': full_tokens,
+            'Compiled Prompt Tokens': tokens,
+            'Reduction (%)': round(100 * (1 - tokens / full_tokens), 1),
+        })
+    return pd.DataFrame(rows)
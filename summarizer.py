@@ -0,0 +1,416 @@
+"""Core summary generation, shared by the Streamlit app and the command-line pipeline."""
+from batching import build_batch_prompt, parse_batch_response, parse_partial_batch, candidate_ids, chunked
+from engine import estimate_tokens, OUTPUT_TOKEN_ESTIMATE
+from prompt_compiler import classify_profiles, compile_prompt
+from summary_cache import make_cache_key, score_profile
+
+# --- The Master Prompt ---
+# This is the full, untrimmed prompt, incorporating all rules and examples.
+MASTER_PROMPT = """
+ROLE
+You are an expert Talent Assessment Analyst at "Your Assessment Company". Your name is "Aura," and your purpose is to synthesize competency score data into insightful, objective, and developmental executive summaries. You write in American English, and you are a master of the assessment framework, adhering strictly to the interpretation guidelines provided below.
+
+CONTEXT
+We are an assessment platform that evaluates candidates on a set of core competencies using a 1-5 scoring scale. Your task is to automate the creation of the executive summary that is shared with the candidate. The summary must be objective, constructive, evidence-based (tied directly to the scores), and written in a formal, professional tone consistent with our brand. The goal is to provide clear feedback on strengths and developmental areas.
+
+TASK
+For a given candidate, you will receive their name and a list of competencies with their corresponding scores (from 1 to 5). Your sole task is to generate a two-paragraph Executive Summary based on these scores. You must follow all rules of interpretation, tone, structure, and formatting provided below without exception.
+
+CORE COMPETENCIES
+Leads Inspirationally
+
+Manages and Solves Problems
+
+Plans and Thinks Strategically
+
+Manages Change
+
+RULES OF INTERPRETATION & CONTENT
+Scoring Guide:
+
+Scores 4 & 5: These are considered Strengths.
+
+Score 3: This is considered a Potential Strength that can be further leveraged.
+
+Scores 1 & 2: These are considered Development Areas.
+
+Executive Summary Structure:
+The summary MUST be exactly two paragraphs and not exceed 400 words in total.
+
+Paragraph 1: Strengths & Potential Strengths (150-200 words)
+
+This paragraph MUST begin with the exact sentence: "As part of the assessment center, you displayed strengths in.." followed by the names of the competencies scored 4 or 5.
+
+First, elaborate on the strengths (scores 4-5).
+
+After discussing the clear strengths, address any potential strengths (score 3). Frame these as solid skills that can be leveraged even further. Substantiate the potential by briefly mentioning the specific behaviors that were observed (e.g., "demonstrating an understanding of their individual needs," "breaking down objectives into actionable steps").
+
+All competency names MUST be capitalized (e.g., Plans and Thinks Strategically).
+
+Paragraph 2: Development Areas (150-200 words)
+
+This paragraph MUST begin with the exact sentence: "Developmentally, scope exists for you to further develop in…" followed by the names of the competencies scored 1 or 2.
+
+Elaborate on the development areas. The language must be constructive and forward-looking.
+
+Crucially, for every developmental point, you must explain the benefit or impact of the improvement. Answer the "why" for the candidate (e.g., "...to enhance your influence," "...to support long-term success").
+
+General Rules:
+
+All 4 competencies MUST be addressed in the summary across the two paragraphs.
+
+The language must be formal, professional, and developmental. Use American English spellings.
+
+All punctuation must be used correctly.
+
+TONE AND STYLE
+Tone: Constructive, formal, objective, and professional.
+
+Voice: Second-person ("You displayed strengths in...").
+
+Language: Use impactful, professional action verbs (e.g., "exhibit," "demonstrate," "foster," "drive"). Avoid generic or weak phrases.
+
+Narrative Flow: Create an integrated narrative. Use transition words and connecting phrases (In conjunction with, Coupled with, Building on this, Similarly) to link ideas between competencies. Do not simply list each competency; synthesize the results into a cohesive summary.
+
+THINGS TO REMEMBER
+NO specific development actions (e.g., "take a course on X"). Suggest the area of focus or type of action (e.g., "exploring different problem-solving methodologies"), not the literal method.
+
+NO reference to technical or industry-specific details. The summary is purely on the behavioural indicators.
+
+NO assumptions. Base the summary only on the scores and the meaning of the competencies.
+
+Even when no specific strengths are identified (see Special Cases), the report must be written in a constructive and positive manner.
+
+SPECIAL CASES (CRITICAL)
+If no competency scores are above 2: The summary should treat all competencies as development areas. Only generate the second paragraph, starting with the standard developmental sentence. Be sure to explain the "why" for each point.
+
+If all competency scores are 3: Treat all competencies as potential areas of effectiveness. The first paragraph MUST begin with "As part of the assessment center, you displayed potential strengths across all key competencies, reflecting scope for further development." It should substantiate the potential observed with behavioral details. The second paragraph must provide specific, actionable development suggestions (e.g., exploring specific frameworks, cultivating a proactive approach) and connect them to tangible business outcomes.
+
+If no competency scores are below 4: Treat all competencies as strengths. The second paragraph must be re-framed to be more concrete and focus on leadership amplification. It should suggest how to leverage these strengths further to role-model behaviors, mentor others, or enhance their organizational impact.
+
+INPUT FORMAT
+You will receive the candidate's data in a simple key-value format as follows:
+
+Candidate Name: [Name]
+Competencies:
+- Leads Inspirationally: [Score]
+- Manages and Solves Problems: [Score]
+- Plans and Thinks Strategically: [Score]
+- Manages Change: [Score]
+
+OUTPUT FORMAT
+Your output must be a single block of text containing only the two-paragraph executive summary. Do not include any headers, titles, or other text.
+
+GOLD STANDARD EXAMPLES (Revised based on SME Feedback)
+Example 1: Low Scores Profile (Revised)
+Input:
+
+Candidate Name: A
+Competencies:
+- Leads Inspirationally: 2
+- Manages and Solves Problems: 1
+- Plans and Thinks Strategically: 1
+- Manages Change: 2
+
+Output:
+Developmentally, scope exists for you to further develop in all competencies. In regard to Manages and Solves Problems, consider ways to proactively identify and remove hurdles, view challenges and conflicts as opportunities for growth and collaboration, and ensure that conflicts are resolved fairly and constructively. Embracing and effectively Managing Change by developing skills in facilitating change initiatives and guiding others through transitions will support your leadership development. Regarding Leads Inspirationally, reflect on your relationships with colleagues and consider ways to foster an inclusive environment that promotes fairness and respect. When faced with charged situations, focus on understanding the behaviors and motivations of others, and respond with emotionally intelligent behaviors to facilitate effective communication, resolve conflicts, and reduce silos. Building networks and engaging in continuous collaboration will help you gain diverse perspectives and strengthen your influence. Lastly, in relation to Plans and Thinks Strategically, consider how to incorporate proactive planning and risk management into your initiatives, aligning team efforts with organizational strategy. Developing a clear understanding of industry trends, external influences, and future opportunities will enable you to deliver work more efficiently and effectively, supporting long-term success.
+
+Example 2: Moderate Scores Profile (Revised)
+Input:
+
+Candidate Name: B
+Competencies:
+- Leads Inspirationally: 4
+- Manages and Solves Problems: 3
+- Plans and Thinks Strategically: 2
+- Manages Change: 2
+
+Output:
+As part of the assessment center, you displayed strengths in Leads Inspirationally and Manages and Solves Problems. In regard to Leads Inspirationally, you demonstrated ability to create an inclusive environment for all team members and address conflicts in a fair manner, to maintain a cooperative work environment. Similarly, you utilize different interpersonal communication strategies to achieve end goals collaboratively and rely on non-verbal cues to drive forward your perspective in a respectful manner. In conjunction, you continue to build networks with relevant internal and external stakeholders to support delivery of organizational goals. In regard to Manages and Solves Problems, you are able to bring together conflicting information or priorities to identify mutual solutions and ways of working. When faced with hurdles, you display ability to bring together different experts to systematically break down the barriers and continue efforts towards end outcomes. Coupled with your interpersonal effectiveness and communication skills, you are able to influence stakeholders with varying priorities to align on mutual solutions.
+
+Developmentally, scope exists for you to further develop in Plans and Thinks Strategically and in Manages Change. In regard to Plans and Thinks Strategically, consider how you can incorporate proactive planning, risk management and strategic objectives when leading an initiative. Identify how you can align the team’s actions and goals with the organization’s strategy, to delivery against organizational vision. Proactive consideration of potential external threats and/or opportunities would enable you to deliver work with great efficiency and effectiveness. Similarly, developing an understanding of the industry dynamics, key current and future trends, and awareness of external factors that can impact your organization and ways of working is critical. In regard to Manages Change, when faced with changing circumstances, consider the need and benefits of this change and communicate this with your team members. Develop openness to change in the workplace and identify how you can contribute towards the implementation of change programs, including training, communication, rewards and resource plans.
+
+Example 3: High Scores Profile (Revised)
+Input:
+
+Candidate Name: C
+Competencies:
+- Leads Inspirationally: 4
+- Manages and Solves Problems: 4
+- Plans and Thinks Strategically: 5
+- Manages Change: 4
+
+Output:
+As part of the assessment center, you displayed strengths across all competencies, demonstrating a high level of effectiveness and professionalism. In Leads Inspirationally, you consistently create an inclusive environment by fostering open communication, encouraging diverse perspectives, and demonstrating genuine respect for others. Your ability to motivate and influence others positively is evident through your capacity to build trust, promote collaboration, and set a compelling vision that inspires your team to achieve shared goals. In Manages and Solves Problems, you exhibit strong analytical thinking and sound judgment, systematically breaking down complex issues, evaluating options thoroughly, and making well-informed decisions. Your proactive approach to identifying solutions and your resilience in overcoming obstacles contribute significantly to your team’s success. Regarding Plans and Thinks Strategically, you demonstrate a clear understanding of organizational priorities, linking your team’s objectives to broader strategic goals. Your ability to anticipate potential risks and opportunities, develop contingency plans, and communicate a compelling vision ensures alignment and sustained progress. Lastly, in Manages Change, you show resilience and adaptability by embracing new initiatives, communicating effectively about change, and supporting others through transitions.
+
+Overall, your consistent demonstration of these competencies positions you as a highly effective leader and a role model for others. Continuing to leverage and role model these strengths will further enhance your influence and impact within your organization.
+
+Example 4: Tie Scores Profile (NEWLY REVISED)
+Input:
+
+Candidate Name: D
+Competencies:
+- Leads Inspirationally: 3
+- Manages and Solves Problems: 3
+- Plans and Thinks Strategically: 3
+- Manages Change: 3
+
+Output:
+As part of the assessment center, you displayed potential strengths across all key competencies, reflecting scope for further development. In Leads Inspirationally, you show the capacity to foster an inclusive environment and build relationships with your team members, demonstrating an understanding of their individual needs and motivations. In Manages and Solves Problems, you demonstrate a natural aptitude for analyzing issues, identifying root causes, and exploring potential solutions. In Plans and Thinks Strategically, you exhibit an awareness of organizational priorities and their connection to individual tasks as you have demonstrated your ability to break down objectives into actionable steps while planning and prioritizing effectively. Additionally, your capacity to Manage Change suggests an openness to organizational transitions and a willingness to adapt to new circumstances and processes.
+
+Developmentally, you can deepen these competencies by engaging in targeted opportunities for growth. In Leads Inspirationally, strengthening your communication skills through active listening will enhance your influence and create a more collaborative team environment. In Manages and Solves Problems, exploring different problem-solving methodologies and decision-making frameworks will further develop your ability to identify and implement effective solutions. As for Plans and Thinks Strategically, expanding your external awareness and incorporating long-term vision into your planning will allow you to contribute more strategically to the organization's success. Additionally, when Managing Change, cultivating a more proactive approach by anticipating potential challenges and developing strategies to mitigate them will enhance your ability to lead and support others through periods of transition. Focusing on these areas will position you as a more effective leader, capable of driving positive change and achieving organizational goals.
+
+
+
+"""
+
+
+# --- Model Settings ---
+EXPECTED_COMPETENCIES = [
+    'Leads Inspirationally', 'Manages and Solves Problems',
+    'Plans and Thinks Strategically', 'Manages Change'
+]
+GENERATION_CONFIG = {'candidate_count': 1, 'temperature': 0.7}
+# Failures are written into the output column behind this prefix, so they can be recognized later
+ERROR_PREFIX = "An error occurred while generating the summary"
+# Batched requests ask for a JSON array of summaries instead of plain text
+BATCH_GENERATION_CONFIG = {**GENERATION_CONFIG, 'response_mime_type': 'application/json'}
+
+
+# --- Functions ---
+
+def build_prompt(candidate_data, competency_cols, master_prompt=MASTER_PROMPT):
+    """Builds the full prompt for a single candidate."""
+    # Format the candidate's scores into a string for the prompt
+    competency_str = "\n".join([f"- {col}: {candidate_data[col]}" for col in competency_cols])
+    
+    # This is the final prompt sent to the API
+    return f"{master_prompt}\n\nHere is the data for the candidate you need to analyze:\n\n```\nCandidate Name: {candidate_data['Candidate Name']}\nCompetencies:\n{competency_str}\n```"
+
+def request_summary(backend, prompt, config=GENERATION_CONFIG):
+    """Sends a prompt to the backend and returns the response text. API errors are raised to the caller."""
+    return backend.generate(prompt, config).text
+
+def request_batch(backend, batch, competency_cols, master_prompt=MASTER_PROMPT, on_partial=None):
+    """
+    Generates summaries for a list of candidates in one request.
+
+    Returns ({position: summary}, GenerationResult); candidates missing from the response are left out.
+    With `on_partial`, the response is streamed and `on_partial({position: summary so far})` is called
+    as it arrives.
+    """
+    ids = candidate_ids(len(batch))
+    prompt = build_batch_prompt(master_prompt, list(zip(ids, batch)), competency_cols)
+    if on_partial is None:
+        result = backend.generate(prompt, BATCH_GENERATION_CONFIG)
+    else:
+        result = backend.generate_stream(
+            prompt, BATCH_GENERATION_CONFIG,
+            lambda text: on_partial({
+                ids.index(candidate_id): summary for candidate_id, summary in parse_partial_batch(text, ids).items()
+            })
+        )
+    parsed = parse_batch_response(result.text, ids)
+    return {ids.index(candidate_id): summary for candidate_id, summary in parsed.items()}, result
+
+def format_error(e):
+    """Formats a generation failure the way it appears in the output column."""
+    return f"{ERROR_PREFIX}: {e}"
+
+def generate_summary(backend, candidate_data, competency_cols):
+    """Generates a summary for a single candidate using the master prompt."""
+    if not backend:
+        return "Error: AI model not initialized."
+
+    try:
+        return request_summary(backend, build_prompt(candidate_data, competency_cols))
+    except Exception as e:
+        return format_error(e)
+
+def _prepare(df, name_col, competency_cols, compact_prompts):
+    """Returns the candidate dicts and the master prompt each row is generated with."""
+    # Plain dicts keyed the way build_prompt expects; much cheaper than renaming a Series per row
+    candidates = [
+        {**scores, 'Candidate Name': name}
+        for scores, name in zip(df[competency_cols].to_dict('records'), df[name_col].tolist())
+    ]
+    if compact_prompts:
+        cases = classify_profiles(df, competency_cols)['profile_case']
+        prompts_by_row = [compile_prompt(MASTER_PROMPT, case) for case in cases]
+    else:
+        prompts_by_row = [MASTER_PROMPT] * len(candidates)
+    return candidates, prompts_by_row
+
+def _cache_keys(backend, candidates, competency_cols, prompts_by_row):
+    return [
+        make_cache_key(score_profile(candidate, competency_cols), prompt, backend.model_name, GENERATION_CONFIG)
+        for candidate, prompt in zip(candidates, prompts_by_row)
+    ]
+
+def cache_keys(backend, df, name_col, competency_cols, compact_prompts=False):
+    """Returns the summary cache key of every row of `df`, as `generate_summaries` computes them."""
+    candidates, prompts_by_row = _prepare(df, name_col, competency_cols, compact_prompts)
+    return _cache_keys(backend, candidates, competency_cols, prompts_by_row)
+
+def generate_summaries(backend, df, name_col, competency_cols, generation_engine, cache=None, batch_size=1,
+                       compact_prompts=False, on_progress=None, metrics=None, on_result=None):
+    """
+    Generates a summary for every row of `df` and returns (summaries, stats), with summaries in row order.
+
+    Rows that share a score profile are generated once. When a `cache` is given, profiles from earlier
+    runs are reused and new summaries are stored; pass `cache=None` to sample a fresh text per candidate.
+    With `batch_size` above 1, candidates are sent several per request, and any candidate missing from
+    a batch response is retried on its own. With `compact_prompts`, each candidate gets a prompt compiled
+    down to the rules and example that apply to their score profile. If a `RunMetrics` is given, every
+    request and every row (keyed by the `df` index) is recorded on it.
+
+    With `on_result`, responses are streamed and `on_result(rows, text, final)` is called with the `df`
+    index labels sharing a summary each time their text grows, and once more with `final=True` as soon
+    as it is complete, so callers can show results long before the whole run finishes.
+    """
+    candidates, prompts_by_row = _prepare(df, name_col, competency_cols, compact_prompts)
+    if cache is None:
+        keys = list(range(len(candidates)))
+    else:
+        keys = _cache_keys(backend, candidates, competency_cols, prompts_by_row)
+
+    # The first row carrying each key stands in for all of its duplicates
+    first_rows = {}
+    for i, key in enumerate(keys):
+        first_rows.setdefault(key, i)
+
+    results = cache.get_many(first_rows) if cache is not None else {}
+    cache_hits = len(results)
+    pending = [key for key in first_rows if key not in results]
+    progress = (lambda index, result, done, total: on_progress(done, total)) if on_progress else None
+    if on_result is not None:
+        rows_by_key = {}
+        for row, key in zip(df.index, keys):
+            rows_by_key.setdefault(key, []).append(row)
+        for key, summary in results.items():
+            on_result(rows_by_key[key], summary, True)
+    fresh = {}
+    # key -> (source, request record, share of that request) for the row metrics
+    origins = {}
+    api_calls = 0
+
+    if batch_size > 1 and len(pending) > 1:
+        # Candidates only share a request when they share a prompt
+        groups = {}
+        for key in pending:
+            groups.setdefault(prompts_by_row[first_rows[key]], []).append(key)
+        batches = [(prompt, batch) for prompt, group in groups.items() for batch in chunked(group, batch_size)]
+
+        def send_batch(item):
+            prompt, batch = item
+            on_partial = None
+            if on_result is not None:
+                def on_partial(partial):
+                    for position, summary in partial.items():
+                        on_result(rows_by_key[batch[position]], summary, False)
+            return request_batch(
+                backend, [candidates[first_rows[key]] for key in batch], competency_cols, prompt, on_partial
+            )
+
+        def batch_complete(index, result, done, total):
+            if on_result is not None:
+                batch = batches[index][1]
+                for position, summary in result[0].items():
+                    on_result(rows_by_key[batch[position]], summary, True)
+            if progress:
+                progress(index, result, done, total)
+
+        timings = {}
+        batch_results = generation_engine.run(
+            batches,
+            send_batch,
+            token_estimate=lambda item: estimate_tokens(item[0]) + OUTPUT_TOKEN_ESTIMATE * len(item[1]),
+            # A failed batch simply leaves all of its candidates to the single-candidate retry below
+            on_error=lambda e: ({}, None),
+            on_complete=batch_complete,
+            on_timing=timings.__setitem__,
+        )
+        api_calls += len(batches)
+        for i, ((_, batch), (parsed, result)) in enumerate(zip(batches, batch_results)):
+            record = None
+            if metrics is not None:
+                record = metrics.record_request(
+                    'batch', len(batch), timings[i],
+                    result.prompt_tokens if result else 0, result.output_tokens if result else 0,
+                )
+            for position, summary in parsed.items():
+                fresh[batch[position]] = summary
+                origins[batch[position]] = ('batch', record, 1 / len(batch))
+        pending = [key for key in pending if key not in fresh]
+
+    prompts = [
+        build_prompt(candidates[first_rows[key]], competency_cols, prompts_by_row[first_rows[key]])
+        for key in pending
+    ]
+
+    def send_single(item):
+        key, prompt = item
+        if on_result is None:
+            return backend.generate(prompt, GENERATION_CONFIG)
+        return backend.generate_stream(
+            prompt, GENERATION_CONFIG, lambda text: on_result(rows_by_key[key], text, False)
+        )
+
+    def single_complete(index, result, done, total):
+        if on_result is not None:
+            summary = format_error(result) if isinstance(result, Exception) else result.text
+            on_result(rows_by_key[pending[index]], summary, True)
+        if progress:
+            progress(index, result, done, total)
+
+    timings = {}
+    generated = generation_engine.run(
+        list(zip(pending, prompts)),
+        send_single,
+        token_estimate=lambda item: estimate_tokens(item[1]) + OUTPUT_TOKEN_ESTIMATE,
+        on_error=lambda e: e,
+        on_complete=single_complete,
+        on_timing=timings.__setitem__,
+    )
+    api_calls += len(prompts)
+
+    for i, (key, result) in enumerate(zip(pending, generated)):
+        failed = isinstance(result, Exception)
+        record = None
+        if metrics is not None:
+            record = metrics.record_request(
+                'single', 1, timings[i],
+                0 if failed else result.prompt_tokens, 0 if failed else result.output_tokens,
+            )
+        if failed:
+            # Failures are reported in the output but never cached
+            results[key] = format_error(result)
+            origins[key] = ('error', record, 1.0)
+        else:
+            fresh[key] = result.text
+            origins[key] = ('api', record, 1.0)
+    results.update(fresh)
+    if cache is not None:
+        cache.put_many(fresh)
+
+    if metrics is not None:
+        seen = set()
+        for i, (row, key) in enumerate(zip(df.index, keys)):
+            candidate = candidates[i]['Candidate Name']
+            if key not in origins:
+                metrics.record_row(row, candidate, 'cache')
+            elif key in seen:
+                # Duplicates reuse the text for free; the request is charged to the first row only
+                metrics.record_row(row, candidate, 'duplicate', origins[key][1], share=0.0)
+            else:
+                source, record, share = origins[key]
+                metrics.record_row(row, candidate, source, record, share)
+            seen.add(key)
+
+    stats = {
+        'rows': len(keys),
+        'unique_profiles': len(first_rows),
+        'cache_hits': cache_hits,
+        'api_calls': api_calls,
+    }
+    return [results[key] for key in keys], stats
@@ -0,0 +1,114 @@
+"""Persistent cache of generated summaries, keyed on the candidate's score profile."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- Defaults ---
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'summary_cache.sqlite3')
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+# --- Keys ---
+
+def normalize_score(value):
+    """Normalizes a score cell so that 4, 4.0 and '4' share a cache entry."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+    return int(number) if number.is_integer() else number
+
+
+def score_profile(candidate_data, competency_cols):
+    """Returns the (competency, score) pairs that fully determine a candidate's summary."""
+    return tuple((col, normalize_score(candidate_data[col])) for col in competency_cols)
+
+
+def make_cache_key(profile, prompt, model_name, generation_config):
+    """Hashes a score profile together with everything else that shapes the generated text."""
+    material = {
+        'profile': [list(pair) for pair in profile],
+        'prompt': hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+        'model': model_name,
+        'config': generation_config,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+# --- Store ---
+
+class SummaryCache:
+    """A small SQLite-backed key/value store with least-recently-used eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS summaries ('
+                'key TEXT PRIMARY KEY, summary TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)')
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+
+    def get_many(self, keys):
+        """Returns a {key: summary} dict for the keys that are cached and marks them as recently used."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock, self.conn:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f'SELECT key, summary FROM summaries WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self.conn.executemany('UPDATE summaries SET last_used = ? WHERE key = ?', [(now, k) for k in found])
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """Stores {key: summary} pairs and evicts the least recently used entries beyond `max_entries`."""
+        if not items:
+            return
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO summaries (key, summary, created_at, last_used) VALUES (?, ?, ?, ?)',
+                [(key, summary, now, now) for key, summary in items.items()]
+            )
+            self.conn.execute(
+                'DELETE FROM summaries WHERE key NOT IN '
+                '(SELECT key FROM summaries ORDER BY last_used DESC LIMIT ?)', (self.max_entries,)
+            )
+
+    def put(self, key, summary):
+        self.put_many({key: summary})
+
+    def delete_many(self, keys):
+        """Evicts the given keys, e.g. summaries that turned out to be invalid."""
+        keys = list(dict.fromkeys(keys))
+        with self.lock, self.conn:
+            self.conn.executemany('DELETE FROM summaries WHERE key = ?', [(key,) for key in keys])
+
+    def clear(self):
+        """Invalidates every cached summary."""
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM summaries')
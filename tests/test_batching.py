@@ -0,0 +1,52 @@
+import json
+
+from batching import candidate_ids, chunked, parse_batch_response, parse_partial_batch
+
+IDS = candidate_ids(3)
+
+
+def test_chunked_splits_in_order():
+    assert chunked(list(range(7)), 3) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_parses_array_as_instructed():
+    text = json.dumps([{'candidate_id': cid, 'summary': f"Summary {cid}"} for cid in IDS])
+    assert parse_batch_response(text, IDS) == {'C1': 'Summary C1', 'C2': 'Summary C2', 'C3': 'Summary C3'}
+
+
+def test_tolerates_code_fences_and_prose():
+    text = 'Here you go:\n```json\n[{"candidate_id": "C1", "summary": "One"}]\n```'
+    assert parse_batch_response(text, IDS) == {'C1': 'One'}
+
+
+def test_accepts_object_keyed_by_id():
+    assert parse_batch_response('{"C2": "Two", "C3": "Three"}', IDS) == {'C2': 'Two', 'C3': 'Three'}
+
+
+def test_drops_unknown_ids_and_empty_summaries():
+    text = json.dumps([
+        {'candidate_id': 'C1', 'summary': '  '},
+        {'candidate_id': 'C9', 'summary': 'Stray'},
+        {'id': 'C2', 'text': 'Two'},
+    ])
+    assert parse_batch_response(text, IDS) == {'C2': 'Two'}
+
+
+def test_recovers_complete_entries_from_truncated_array():
+    text = '[{"candidate_id": "C1", "summary": "One"}, {"candidate_id": "C2", "summary": "Tw'
+    assert parse_batch_response(text, IDS) == {'C1': 'One'}
+
+
+def test_garbage_yields_nothing():
+    assert parse_batch_response('not json at all', IDS) == {}
+    assert parse_batch_response(None, IDS) == {}
+
+
+def test_partial_batch_reads_open_strings():
+    text = '[{"candidate_id": "C1", "summary": "First paragraph.\\n\\nSecond"}, {"candidate_id": "C2", "summary": "Sta'
+    assert parse_partial_batch(text, IDS) == {'C1': 'First paragraph.\n\nSecond', 'C2': 'Sta'}
+
+
+def test_partial_batch_drops_trailing_partial_escape():
+    assert parse_partial_batch('[{"candidate_id": "C1", "summary": "Line one\\', IDS) == {'C1': 'Line one'}
+    assert parse_partial_batch('[{"candidate_id": "C1", "summary": "Caf\\u00', IDS) == {'C1': 'Caf'}
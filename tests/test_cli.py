@@ -0,0 +1,40 @@
+import zipfile
+
+import pytest
+
+import cli
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    monkeypatch.setenv('GEMINI_API_KEY', 'test')
+
+
+def test_missing_input_is_reported(tmp_path, capsys):
+    assert cli.main([str(tmp_path / 'missing.csv')]) == 2
+    assert capsys.readouterr().err.startswith('Error:')
+
+
+@pytest.mark.parametrize('name, content', [
+    ('garbage.xlsx', b'garbage'),
+    ('not_a_workbook.xlsx', None),
+    ('garbage.parquet', b'garbage'),
+    ('candidates.txt', b'a,b\n'),
+])
+def test_unreadable_input_is_reported(tmp_path, capsys, name, content):
+    path = tmp_path / name
+    if content is None:
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('readme.txt', 'not a workbook')
+    else:
+        path.write_bytes(content)
+    assert cli.main([str(path)]) == 2
+    err = capsys.readouterr().err
+    assert err.startswith('Error:')
+    assert 'Traceback' not in err
+
+
+def test_missing_api_key_is_reported(tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv('GEMINI_API_KEY')
+    assert cli.main([str(tmp_path / 'candidates.csv')]) == 2
+    assert 'GEMINI_API_KEY' in capsys.readouterr().err
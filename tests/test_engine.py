@@ -0,0 +1,23 @@
+import time
+
+import pytest
+
+from engine import GenerationEngine, TokenBucket
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(6000)  # 100 per second
+    assert bucket.acquire(6000) == 0.0
+    started = time.monotonic()
+    waited = bucket.acquire(10)
+    assert 0.05 < waited < 0.5
+    assert time.monotonic() - started == pytest.approx(waited, abs=0.1)
+
+
+def test_token_bucket_clamps_oversized_requests():
+    assert TokenBucket(60).acquire(1000) == 0.0
+
+
+def test_engine_returns_results_in_input_order():
+    engine = GenerationEngine(max_workers=4)
+    assert engine.run(range(20), lambda i: time.sleep(0.001 * (20 - i)) or i * 2) == [i * 2 for i in range(20)]
@@ -0,0 +1,56 @@
+import os
+import zipfile
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from export import ResultExporter, read_parquet_rows, XLSX, PARQUET, CSV
+
+
+def test_parquet_accepts_values_in_columns_empty_in_the_first_chunk(tmp_path):
+    exporter = ResultExporter(['Name', 'Summary'], formats=(PARQUET,), directory=str(tmp_path))
+    exporter.write(pd.DataFrame({'Name': ['a'], 'Summary': [None]}))
+    exporter.write(pd.DataFrame({'Name': ['b'], 'Summary': ['text']}))
+    exporter.close()
+    rows = read_parquet_rows(exporter.paths[PARQUET], 0, 2)
+    assert rows['Summary'].tolist()[1] == 'text'
+    assert rows.index.tolist() == [0, 1]
+
+
+def test_spreadsheet_cells_are_never_formulas_or_links(tmp_path):
+    exporter = ResultExporter(['Name'], formats=(XLSX,), directory=str(tmp_path))
+    exporter.write(pd.DataFrame({'Name': ['=HYPERLINK("http://example.com","x")', 'http://example.com']}))
+    exporter.close()
+    with zipfile.ZipFile(exporter.paths[XLSX]) as workbook:
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+    assert '<f>' not in sheet
+    assert '<hyperlinks>' not in sheet
+
+
+def test_csv_can_be_read_while_rows_are_appended(tmp_path):
+    exporter = ResultExporter(['Name'], formats=(CSV,), directory=str(tmp_path))
+    exporter.write(pd.DataFrame({'Name': ['a', 'b']}))
+    assert exporter.reader(CSV)().decode('utf-8-sig').splitlines() == ['Name', 'a', 'b']
+    exporter.discard()
+
+
+def test_parquet_buffers_chunks_into_row_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr('export.ROW_GROUP_SIZE', 3)
+    exporter = ResultExporter(['Name'], formats=(PARQUET,), directory=str(tmp_path))
+    for name in 'abcde':
+        exporter.write(pd.DataFrame({'Name': [name]}))
+    exporter.close()
+    parquet_file = pq.ParquetFile(exporter.paths[PARQUET])
+    assert [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)] == [3, 2]
+    assert read_parquet_rows(exporter.paths[PARQUET], 2, 4)['Name'].tolist() == ['c', 'd']
+
+
+def test_replace_rows_rewrites_every_format(tmp_path, monkeypatch):
+    monkeypatch.setattr('export.ROW_GROUP_SIZE', 2)
+    exporter = ResultExporter(['Name', 'Summary'], directory=str(tmp_path))
+    exporter.write(pd.DataFrame({'Name': ['a', 'b', 'c'], 'Summary': ['old', 'old', 'old']}))
+    exporter.replace_rows({2: {'Summary': 'new'}})
+    assert exporter.read_rows(0, 3)['Summary'].tolist() == ['old', 'old', 'new']
+    assert exporter.reader(CSV)().decode('utf-8-sig').splitlines()[1:] == ['a,old', 'b,old', 'c,new']
+    assert pd.read_excel(exporter.paths[XLSX])['Summary'].tolist() == ['old', 'old', 'new']
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in exporter.paths.values())
@@ -0,0 +1,55 @@
+import io
+
+import pandas as pd
+import pytest
+
+from ingest import compact_scores, content_hash, load_table, read_columns
+
+COLUMNS = ['Candidate Name', 'Notes', 'Leads Inspirationally', 'Manages Change', 'Rating']
+
+
+def upload(file_format='csv'):
+    df = pd.DataFrame({
+        'Candidate Name': ['A', 'B', None, 'C'],
+        'Notes': ['x', 'y', None, 'z'],
+        'Leads Inspirationally': [4, 3, None, 5],
+        'Manages Change': [3.5, 2.0, None, 4.0],
+        'Rating': ['High', 'Low', None, 'High'],
+    })
+    buffer = io.BytesIO()
+    if file_format == 'parquet':
+        df.to_parquet(buffer, index=False)
+    else:
+        df.to_csv(buffer, index=False)
+    return buffer.getvalue(), f"candidates.{file_format}"
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_reads_columns_without_data(file_format):
+    assert read_columns(*upload(file_format)) == COLUMNS
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_loads_only_selected_columns_in_compact_types(file_format):
+    data, file_name = upload(file_format)
+    df = load_table(data, file_name, 'Candidate Name', ['Leads Inspirationally', 'Manages Change', 'Rating'])
+    assert df.columns.tolist() == ['Candidate Name', 'Leads Inspirationally', 'Manages Change', 'Rating']
+    # The empty row is dropped and rows are renumbered by position
+    assert df.index.tolist() == [0, 1, 2]
+    assert str(df['Leads Inspirationally'].dtype) == 'Int8'
+    assert df['Manages Change'].dtype == 'float32'
+    assert df['Rating'].dtype == 'category'
+
+
+def test_compact_scores_keeps_values_outside_int8():
+    assert compact_scores(pd.Series([1, 200])).dtype == 'float32'
+    assert compact_scores(pd.Series([1, None, 5])).tolist()[::2] == [1, 5]
+
+
+def test_rejects_unsupported_files():
+    with pytest.raises(ValueError, match='Unsupported file type'):
+        read_columns(b'', 'candidates.txt')
+
+
+def test_identical_uploads_share_a_hash():
+    assert content_hash(b'abc') == content_hash(b'abc') != content_hash(b'abd')
@@ -0,0 +1,38 @@
+import threading
+import time
+
+import pytest
+
+from engine import GenerationCancelled, TokenBucket
+from jobs import FairScheduler, JobManager, CANCELLED, DONE
+
+
+def test_token_bucket_wait_is_cancellable():
+    bucket = TokenBucket(60)
+    bucket.acquire(60)
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(GenerationCancelled):
+        bucket.acquire(30, cancel)
+    assert time.monotonic() - started < 1
+
+
+def test_cancelling_a_job_releases_its_queued_requests():
+    manager = JobManager(FairScheduler(requests_per_minute=30, tokens_per_minute=10 ** 9), max_workers=4)
+    slow = manager.submit(lambda job, engine: engine.run(range(40), lambda i: i), owner='a')
+    other = manager.submit(lambda job, engine: engine.run(range(3), lambda i: i), owner='b')
+    time.sleep(0.5)
+    slow.cancel()
+    deadline = time.monotonic() + 2
+    while not (slow.finished and other.finished) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slow.status == CANCELLED
+    assert other.status == DONE
+    assert 'a' not in manager.scheduler.waiting
+
+
+def test_submitted_job_keeps_its_source():
+    manager = JobManager(FairScheduler(), max_workers=1)
+    job = manager.submit(lambda job, engine: None, owner='a', source=('digest', 'Name', ('Score',)))
+    assert manager.get(job.id).source == ('digest', 'Name', ('Score',))
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from engine import RequestTiming
+from metrics import RunMetrics, estimate_cost, percentile
+
+
+def timing(latency, queue_wait=0.0, retries=0, error=None):
+    result = RequestTiming()
+    result.latency, result.queue_wait, result.retries, result.error = latency, queue_wait, retries, error
+    return result
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 50) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(101)), 95) == 95
+
+
+def test_summary_totals_requests_and_rows():
+    metrics = RunMetrics('gemini-2.5-pro')
+    batch = metrics.record_request('batch', 2, timing(2.0, queue_wait=1.0, retries=1), 1000, 400)
+    metrics.record_request('single', 1, timing(4.0, error='boom'))
+    metrics.record_row(0, 'A', 'batch', batch, share=0.5)
+    metrics.record_row(1, 'B', 'batch', batch, share=0.5)
+    metrics.record_row(1, 'B', 'api')  # a regenerated row is counted once
+    metrics.record_row(2, 'C', 'cache')
+
+    summary = metrics.summary()
+    assert summary['rows'] == 3
+    assert summary['api_calls'] == 2
+    assert summary['failed_calls'] == 1
+    assert summary['retries'] == 1
+    assert (summary['prompt_tokens'], summary['output_tokens']) == (1000, 400)
+    assert summary['estimated_cost_usd'] == pytest.approx(estimate_cost('gemini-2.5-pro', 1000, 400), abs=1e-4)
+    assert summary['queue_wait_mean_s'] == 0.5
+    assert summary['latency_p95_s'] == 4.0
+
+    rows = metrics.rows_frame()
+    assert rows['Prompt Tokens'].tolist()[:2] == [500, 500]
+    assert rows['Estimated Cost (USD)'].iloc[0] == pytest.approx(batch.cost / 2, abs=1e-6)
+
+
+def test_exports_jsonl_and_prometheus():
+    metrics = RunMetrics('simulated')
+    metrics.record_request('single', 1, timing(1.5), 100, 50)
+    lines = [json.loads(line) for line in metrics.to_jsonl().splitlines()]
+    assert [line['type'] for line in lines] == ['request', 'summary']
+    assert lines[0]['prompt_tokens'] == 100
+
+    text = metrics.to_prometheus()
+    assert 'summary_api_calls_total{model="simulated"} 1' in text
+    assert 'summary_tokens_total{model="simulated",type="output"} 50' in text
+    assert 'summary_request_latency_seconds_bucket{model="simulated",le="1"} 0' in text
+    assert 'summary_request_latency_seconds_bucket{model="simulated",le="2.5"} 1' in text
+    assert 'summary_request_latency_seconds_count{model="simulated"} 1' in text
@@ -0,0 +1,80 @@
+import csv
+import random
+
+import pandas as pd
+import pytest
+
+from backends import SimulatedBackend
+from engine import GenerationEngine
+from pipeline import journal_path_for, read_journal, run_job, SUMMARY_COLUMN
+from summarizer import EXPECTED_COMPETENCIES
+
+ROWS = 45
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    rng = random.Random(0)
+    path = tmp_path / 'candidates.csv'
+    pd.DataFrame({
+        'Candidate Name': [f"Candidate {i}" for i in range(ROWS)],
+        **{col: [rng.randint(1, 5) for _ in range(ROWS)] for col in EXPECTED_COMPETENCIES},
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def run(input_path, output_path, **options):
+    options.setdefault('competency_cols', EXPECTED_COMPETENCIES)
+    return run_job(
+        input_path, output_path, SimulatedBackend(latency_median=0.001, seed=0), GenerationEngine(max_workers=4),
+        chunk_size=10, **options
+    )
+
+
+def interrupt_after(rows):
+    def on_progress(rows_done, totals):
+        if rows_done >= rows:
+            raise Interrupted()
+    return on_progress
+
+
+def read_csv(path, **kwargs):
+    with open(path, newline='', **kwargs) as f:
+        return list(csv.DictReader(f))
+
+
+def test_resume_continues_after_the_last_journaled_chunk(input_path, tmp_path):
+    output_path = str(tmp_path / 'out.csv')
+    with pytest.raises(Interrupted):
+        run(input_path, output_path, on_progress=interrupt_after(20))
+    assert read_journal(journal_path_for(output_path))[0] == 20
+
+    totals = run(input_path, output_path)
+    assert totals['skipped_rows'] == 20
+    assert totals['rows'] == ROWS - 20
+
+    rows = read_csv(output_path, encoding='utf-8-sig')
+    assert [row['Candidate Name'] for row in rows] == [f"Candidate {i}" for i in range(ROWS)]
+    assert all(row[SUMMARY_COLUMN] for row in rows)
+    assert len(read_csv(f"{output_path}.metrics.csv", encoding='utf-8')) == ROWS
+
+
+def test_resume_refuses_a_different_column_selection(input_path, tmp_path):
+    output_path = str(tmp_path / 'out.csv')
+    with pytest.raises(Interrupted):
+        run(input_path, output_path, on_progress=interrupt_after(10))
+    with pytest.raises(ValueError, match='different'):
+        run(input_path, output_path, competency_cols=EXPECTED_COMPETENCIES[:2])
+
+    totals = run(input_path, output_path, competency_cols=EXPECTED_COMPETENCIES[:2], resume=False)
+    assert totals['skipped_rows'] == 0
+    assert len(read_csv(output_path, encoding='utf-8-sig')) == ROWS
+
+
+def test_missing_columns_are_rejected(input_path, tmp_path):
+    with pytest.raises(ValueError, match='Competency columns not found'):
+        run(input_path, str(tmp_path / 'out.csv'), competency_cols=['Nonexistent'])
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from prompt_compiler import (
+    classify_profiles, classify_scores, compile_prompt,
+    ALL_DEVELOPMENT, ALL_POTENTIAL, ALL_STRENGTHS, MIXED,
+)
+from summarizer import EXPECTED_COMPETENCIES, MASTER_PROMPT
+
+PROFILES = {
+    ALL_DEVELOPMENT: [2, 1, 1, 2],
+    MIXED: [4, 3, 2, 2],
+    ALL_STRENGTHS: [4, 4, 5, 4],
+    ALL_POTENTIAL: [3, 3, 3, 3],
+}
+
+
+def test_classify_profiles_matches_scalar_classification():
+    df = pd.DataFrame(list(PROFILES.values()), columns=EXPECTED_COMPETENCIES)
+    profiles = classify_profiles(df, EXPECTED_COMPETENCIES)
+    assert profiles['profile_case'].tolist() == list(PROFILES)
+    assert [classify_scores(scores) for scores in PROFILES.values()] == list(PROFILES)
+    mixed = profiles.iloc[1]
+    assert mixed['strengths'] == 'Leads Inspirationally'
+    assert mixed['potential_strengths'] == 'Manages and Solves Problems'
+    assert mixed['development_areas'] == 'Plans and Thinks Strategically, Manages Change'
+
+
+def test_classify_profiles_accepts_compact_score_columns():
+    df = pd.DataFrame(list(PROFILES.values()), columns=EXPECTED_COMPETENCIES)
+    compact = df.astype({EXPECTED_COMPETENCIES[0]: 'Int8', EXPECTED_COMPETENCIES[1]: 'category'})
+    assert classify_profiles(compact, EXPECTED_COMPETENCIES)['profile_case'].tolist() == list(PROFILES)
+
+
+def test_compiled_prompt_keeps_only_the_matching_example():
+    prompt = compile_prompt(MASTER_PROMPT, ALL_POTENTIAL)
+    assert 'Example 4:' in prompt
+    assert 'Example 1:' not in prompt and 'Example 2:' not in prompt
+    assert len(prompt) < len(MASTER_PROMPT)
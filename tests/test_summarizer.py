@@ -0,0 +1,113 @@
+import json
+
+import pandas as pd
+import pytest
+
+from backends import SimulatedBackend
+from engine import GenerationEngine
+from metrics import RunMetrics
+from summarizer import EXPECTED_COMPETENCIES, generate_summaries
+from summary_cache import SummaryCache
+
+PROFILES = [[4, 3, 2, 2], [5, 5, 4, 4], [1, 2, 2, 1]]
+
+
+def cohort(rows):
+    """Returns `rows` candidates cycling through PROFILES."""
+    scores = [PROFILES[i % len(PROFILES)] for i in range(rows)]
+    return pd.DataFrame({
+        'Candidate Name': [f"Candidate {i}" for i in range(rows)],
+        **{col: [row[j] for row in scores] for j, col in enumerate(EXPECTED_COMPETENCIES)},
+    })
+
+
+def generate(backend, df, **options):
+    return generate_summaries(
+        backend, df, 'Candidate Name', EXPECTED_COMPETENCIES, GenerationEngine(max_workers=4), **options
+    )
+
+
+def test_duplicate_profiles_are_generated_once(tmp_path):
+    df = cohort(10)
+    backend = SimulatedBackend(latency_median=0.001, seed=0)
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'))
+
+    summaries, stats = generate(backend, df, cache=cache)
+    assert stats == {'rows': 10, 'unique_profiles': 3, 'cache_hits': 0, 'api_calls': 3}
+    assert summaries[0] == summaries[3] == summaries[9]
+    assert summaries[0] != summaries[1]
+
+    again, stats = generate(backend, df, cache=cache)
+    assert stats == {'rows': 10, 'unique_profiles': 3, 'cache_hits': 3, 'api_calls': 0}
+    assert again == summaries
+    assert backend.calls == 3
+
+
+def test_without_a_cache_every_row_is_sampled():
+    summaries, stats = generate(SimulatedBackend(latency_median=0.001, seed=0), cohort(5))
+    assert stats['api_calls'] == 5
+    assert all(summaries)
+
+
+class DroppingBackend(SimulatedBackend):
+    """Answers batch requests without their last candidate, as a truncated response would."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.kinds = []
+
+    def generate_stream(self, prompt, config, on_text):
+        result = super().generate_stream(prompt, config, None)
+        batched = config.get('response_mime_type') == 'application/json'
+        self.kinds.append('batch' if batched else 'single')
+        if batched:
+            result.text = json.dumps(json.loads(result.text)[:-1])
+        if on_text is not None:
+            on_text(result.text)
+        return result
+
+
+def test_candidates_missing_from_a_batch_are_retried_singly(tmp_path):
+    df = cohort(6).assign(**{EXPECTED_COMPETENCIES[0]: [1, 2, 3, 4, 5, 4]})
+    backend = DroppingBackend(latency_median=0.001, seed=0)
+    summaries, stats = generate(backend, df, cache=SummaryCache(str(tmp_path / 'cache.sqlite3')), batch_size=3)
+
+    assert sorted(backend.kinds) == ['batch', 'batch', 'single', 'single']
+    assert stats['api_calls'] == 4
+    assert all(summaries)
+    assert not any(summary.startswith('[') for summary in summaries)
+
+
+def test_batched_rows_share_their_request_cost(tmp_path):
+    df = cohort(6).assign(**{EXPECTED_COMPETENCIES[0]: [1, 2, 3, 4, 5, 4]})
+    backend = SimulatedBackend(latency_median=0.001, seed=0)
+    metrics = RunMetrics(backend.model_name)
+    generate(backend, df, cache=SummaryCache(str(tmp_path / 'cache.sqlite3')), batch_size=3, metrics=metrics)
+
+    requests = metrics.pop_requests()
+    rows = metrics.rows_frame()
+    assert [r.kind for r in requests] == ['batch', 'batch']
+    assert rows['Source'].tolist() == ['batch'] * 6
+    # Shares are rounded per row
+    assert rows['Output Tokens'].sum() == pytest.approx(sum(r.output_tokens for r in requests), abs=len(rows))
+    assert rows['Estimated Cost (USD)'].sum() == pytest.approx(sum(r.cost for r in requests), abs=1e-5)
+
+
+def test_results_stream_before_each_row_is_final(tmp_path):
+    df = cohort(6)
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'))
+    backend = SimulatedBackend(latency_median=0.001, seed=0)
+    events = []
+    generate(backend, df.iloc[:1], cache=cache)
+    summaries, _ = generate(backend, df, cache=cache, on_result=lambda rows, text, final: events.append((rows, text, final)))
+
+    for row in df.index:
+        texts = [(text, final) for rows, text, final in events if row in rows]
+        finals = [text for text, final in texts if final]
+        # Exactly one final text, after every partial, matching the returned summary
+        assert finals == [summaries[row]]
+        assert texts[-1] == (summaries[row], True)
+        partials = [text for text, final in texts if not final]
+        assert all(summaries[row].startswith(text) for text in partials)
+    # Cached profiles are final straight away, before any request is made
+    assert events[0][2] is True
@@ -0,0 +1,40 @@
+import time
+
+from summary_cache import SummaryCache, make_cache_key, normalize_score, score_profile
+
+
+def test_equal_scores_share_a_profile():
+    assert normalize_score('4') == normalize_score(4.0) == 4
+    assert normalize_score(3.5) == 3.5
+    assert score_profile({'A': '4', 'B': 2.0}, ['A', 'B']) == score_profile({'A': 4, 'B': '2'}, ['A', 'B'])
+
+
+def test_key_depends_on_prompt_and_model():
+    profile = (('A', 4),)
+    key = make_cache_key(profile, 'prompt', 'model', {'temperature': 0.7})
+    assert key == make_cache_key(profile, 'prompt', 'model', {'temperature': 0.7})
+    assert key != make_cache_key(profile, 'other prompt', 'model', {'temperature': 0.7})
+    assert key != make_cache_key(profile, 'prompt', 'other model', {'temperature': 0.7})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    cache.put('a', 'A')
+    time.sleep(0.01)
+    cache.put('b', 'B')
+    time.sleep(0.01)
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('a') == 'A'
+    time.sleep(0.01)
+    cache.put('c', 'C')
+    assert len(cache) == 2
+    assert cache.get_many(['a', 'b', 'c']) == {'a': 'A', 'c': 'C'}
+
+
+def test_delete_and_clear(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'))
+    cache.put_many({'a': 'A', 'b': 'B', 'c': 'C'})
+    cache.delete_many(['a', 'missing'])
+    assert cache.get_many(['a', 'b']) == {'b': 'B'}
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,67 @@
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from backends import SimulatedBackend
+from engine import GenerationEngine
+from prompt_compiler import split_sections, _examples, ALL_POTENTIAL, MIXED
+from summarizer import EXPECTED_COMPETENCIES, MASTER_PROMPT, generate_summaries
+from summary_cache import SummaryCache
+from validator import regenerate_invalid, validate_results, validate_summary
+
+SCORE_LINE = re.compile(r'^- (.+): (\d)$', re.MULTILINE)
+
+
+def gold_examples():
+    """Returns (scores frame row, output text) for every gold standard example in the master prompt."""
+    section = split_sections(MASTER_PROMPT)['GOLD STANDARD EXAMPLES']
+    examples = []
+    for number, text in sorted(_examples(section).items()):
+        given, output = text.split('Output:', 1)
+        scores = {name: int(score) for name, score in SCORE_LINE.findall(given)}
+        examples.append(pytest.param(scores, output.strip(), id=f"example-{number}"))
+    return examples
+
+
+@pytest.mark.parametrize('scores, output', gold_examples())
+def test_gold_examples_are_valid(scores, output):
+    df = pd.DataFrame([{'Candidate Name': 'Gold', **scores}])
+    assert validate_results(df, [output], EXPECTED_COMPETENCIES) == [[]]
+
+
+def test_reports_each_broken_rule():
+    text = "In summary, you did well in leads inspirationally.\n\nDevelopmentally, more to do."
+    issues = validate_summary(text, EXPECTED_COMPETENCIES, MIXED)
+    assert 'paragraph 1 must open with "As part of the assessment center, you displayed strengths in"' in issues
+    assert 'Leads Inspirationally is not capitalized' in issues
+    assert 'does not name Manages Change' in issues
+
+
+def test_flags_errors_and_length():
+    assert validate_summary("An error occurred while generating the summary: 503", [], MIXED) == ["generation error"]
+    assert validate_summary("", [], MIXED) == ["empty summary"]
+    long_text = "As part of the assessment center, you displayed potential strengths across all key competencies, " \
+                "reflecting scope for further development. " + "word " * 400
+    text = long_text + "\n\nDevelopmentally, more."
+    assert validate_summary(text, [], ALL_POTENTIAL) == [f"{len(text.split())} words, limit is 400"]
+
+
+def test_regeneration_sends_one_request_per_cache_key(tmp_path):
+    rows = 20
+    df = pd.DataFrame({'Candidate Name': [f"c{i}" for i in range(rows)], **{c: [3] * rows for c in EXPECTED_COMPETENCIES}})
+    backend = SimulatedBackend(latency_median=0.001, invalid_rate=1.0, seed=0)
+    engine = GenerationEngine(max_workers=4)
+    cache = SummaryCache(os.path.join(tmp_path, 'cache.sqlite3'))
+    summaries, _ = generate_summaries(backend, df, 'Candidate Name', EXPECTED_COMPETENCIES, engine, cache=cache)
+    assert backend.calls == 1
+
+    summaries, violations, stats = regenerate_invalid(
+        backend, df, 'Candidate Name', EXPECTED_COMPETENCIES, engine, summaries, cache=cache, max_attempts=2
+    )
+    assert backend.calls == 3
+    assert len(set(summaries)) == 1
+    assert stats == {'invalid_rows': rows, 'regenerated': rows, 'attempts': 2, 'still_invalid': rows}
+    # Invalid texts are never cached
+    assert len(cache) == 0
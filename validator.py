@@ -0,0 +1,157 @@
+"""Checks generated summaries against the prompt's hard rules and regenerates only the rows that break them."""
+import re
+from functools import lru_cache
+
+from prompt_compiler import classify_profiles, ALL_DEVELOPMENT, ALL_POTENTIAL, ALL_STRENGTHS
+from summarizer import ERROR_PREFIX, cache_keys, generate_summaries
+
+# --- Rules ---
+MAX_WORDS = 400
+DEFAULT_MAX_ATTEMPTS = 2
+VALIDATION_COLUMN = 'Validation Issues'
+
+STRENGTHS_OPENING = re.compile(r'As part of the assessment center, you displayed (?:potential )?strengths (?:in|across)\b')
+POTENTIAL_OPENING = re.compile(
+    r'As part of the assessment center, you displayed potential strengths across all key competencies, '
+    r'reflecting scope for further development\.'
+)
+DEVELOPMENT_OPENING = re.compile(r'Developmentally, scope exists for you to further develop in\b')
+DEVELOPMENTALLY = re.compile(r'Developmentally,')
+ERROR_PATTERN = re.compile(r'^\s*(?:' + re.escape(ERROR_PREFIX) + r'|Error:)')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+# Words left lowercase inside competency names
+MINOR_WORDS = {'a', 'an', 'and', 'as', 'at', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+# Inflections stripped from competency words, so "Managing Change" still names "Manages Change"
+WORD_SUFFIX = re.compile(r'(?:es|s|ing|ally|ly|e)$')
+
+
+@lru_cache(maxsize=None)
+def competency_patterns(name):
+    """
+    Compiles two patterns matching `name` and inflections of its words: one requiring the name's
+    capitalization and a case-insensitive one. The first is tried on its own, as valid summaries
+    always match it and a case-sensitive search is several times faster.
+    """
+    parts = []
+    for word in name.split():
+        if word.lower() in MINOR_WORDS:
+            parts.append(re.escape(word.lower()))
+            continue
+        stem = word if len(word) <= 3 else WORD_SUFFIX.sub('', word)
+        parts.append(re.escape(stem[0].upper() + stem[1:]) + r'\w*')
+    pattern = r'\b' + r'\s+'.join(parts) + r'\b'
+    return re.compile(pattern), re.compile(pattern, re.IGNORECASE)
+
+
+def _opening_rules(profile_case, has_development):
+    """Returns the (pattern, quoted sentence) each paragraph must open with; None where any opening is fine."""
+    development = (DEVELOPMENT_OPENING, "Developmentally, scope exists for you to further develop in")
+    if profile_case == ALL_DEVELOPMENT:
+        return [development]
+    if profile_case == ALL_POTENTIAL:
+        return [
+            (POTENTIAL_OPENING, "As part of the assessment center, you displayed potential strengths across all key competencies"),
+            (DEVELOPMENTALLY, "Developmentally,"),
+        ]
+    strengths = (STRENGTHS_OPENING, "As part of the assessment center, you displayed strengths in")
+    if profile_case == ALL_STRENGTHS or not has_development:
+        return [strengths, None]
+    return [strengths, development]
+
+
+def validate_summary(text, competency_cols, profile_case, has_development=True):
+    """Returns the list of rule violations in one summary; empty when it is valid."""
+    if not isinstance(text, str) or not text.strip():
+        return ["empty summary"]
+    if ERROR_PATTERN.match(text):
+        return ["generation error"]
+
+    issues = []
+    paragraphs = [p.strip() for p in PARAGRAPH_BREAK.split(text.strip()) if p.strip()]
+    rules = _opening_rules(profile_case, has_development)
+    if len(paragraphs) != len(rules):
+        issues.append(f"expected {len(rules)} paragraph{'s' if len(rules) > 1 else ''}, found {len(paragraphs)}")
+    for number, (paragraph, rule) in enumerate(zip(paragraphs, rules), start=1):
+        if rule is not None and not rule[0].match(paragraph):
+            issues.append(f'paragraph {number} must open with "{rule[1]}"')
+
+    words = len(text.split())
+    if words > MAX_WORDS:
+        issues.append(f"{words} words, limit is {MAX_WORDS}")
+
+    for name in competency_cols:
+        capitalized, any_case = competency_patterns(name)
+        if capitalized.search(text):
+            continue
+        issues.append(f"{name} is not capitalized" if any_case.search(text) else f"does not name {name}")
+    return issues
+
+
+def validate_results(df, summaries, competency_cols):
+    """Validates one summary per row of `df`; returns a list of violation lists in row order."""
+    profiles = classify_profiles(df, competency_cols)
+    return [
+        validate_summary(summary, competency_cols, profile_case, bool(development))
+        for summary, profile_case, development in zip(
+            summaries, profiles['profile_case'], profiles['development_areas']
+        )
+    ]
+
+
+def format_issues(issues):
+    """Formats a row's violations the way they appear in the output."""
+    return '; '.join(issues)
+
+
+def regenerate_invalid(backend, df, name_col, competency_cols, generation_engine, summaries, cache=None,
+                       max_attempts=DEFAULT_MAX_ATTEMPTS, compact_prompts=False, metrics=None, on_result=None):
+    """
+    Validates `summaries` and regenerates only the rows that fail, for up to `max_attempts` rounds.
+
+    Regeneration bypasses the cache, one request per failing summary. With a `cache`, rows sharing a cache
+    key share one summary, so one row per key is regenerated and its text applied to the others. Failing
+    keys are evicted and only regenerated summaries that pass are stored again, so an invalid text is
+    never served twice. Returns (summaries, violations, stats), with summaries and violations in row order;
+    `stats['regenerated']` counts distinct rows.
+    """
+    summaries = list(summaries)
+    violations = validate_results(df, summaries, competency_cols)
+    keys = cache_keys(backend, df, name_col, competency_cols, compact_prompts) if cache is not None else None
+    stats = {'invalid_rows': sum(1 for issues in violations if issues), 'regenerated': 0, 'attempts': 0}
+    regenerated = set()
+
+    while stats['attempts'] < max_attempts:
+        failing = [i for i, issues in enumerate(violations) if issues]
+        if not failing:
+            break
+        stats['attempts'] += 1
+        regenerated.update(failing)
+        # key -> positions of the failing rows sharing it; the first one is sent
+        groups = {}
+        for i in failing:
+            groups.setdefault(keys[i] if keys is not None else i, []).append(i)
+        if cache is not None:
+            cache.delete_many(groups)
+
+        subset = df.iloc[[rows[0] for rows in groups.values()]]
+        forward = on_result
+        if on_result is not None and keys is not None:
+            labels = {df.index[rows[0]]: [df.index[i] for i in rows] for rows in groups.values()}
+
+            def forward(rows, text, final):
+                on_result([label for row in rows for label in labels[row]], text, final)
+
+        fresh, _ = generate_summaries(
+            backend, subset, name_col, competency_cols, generation_engine,
+            compact_prompts=compact_prompts, metrics=metrics, on_result=forward,
+        )
+        for rows, summary, issues in zip(groups.values(), fresh, validate_results(subset, fresh, competency_cols)):
+            for i in rows:
+                summaries[i], violations[i] = summary, issues
+        if cache is not None:
+            cache.put_many({key: summaries[rows[0]] for key, rows in groups.items() if not violations[rows[0]]})
+
+    stats['regenerated'] = len(regenerated)
+    stats['still_invalid'] = sum(1 for issues in violations if issues)
+    return summaries, violations, stats